@@ -0,0 +1,111 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth_token:{digest}'
+
+
+def get_token_digest(key):
+    """Хэш токена: сам токен не используется как ключ кэша."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class LocalTokenCache:
+    """
+    Ограниченный LRU-кэш пользователей по токену в памяти процесса.
+    Записи живут не дольше заданного времени.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return user
+
+    def set(self, digest, user, timeout):
+        with self.lock:
+            self.entries[digest] = (user, time.monotonic() + timeout)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, digest):
+        with self.lock:
+            self.entries.pop(digest, None)
+
+
+local_token_cache = LocalTokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def invalidate_token(key):
+    """Удаляет пользователя токена из кэша процесса и общего кэша."""
+    digest = get_token_digest(key)
+    local_token_cache.delete(digest)
+    if settings.TOKEN_CACHE_SHARED:
+        cache.delete(TOKEN_CACHE_KEY.format(digest=digest))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пользователя.
+    Пользователь ищется в LRU-кэше процесса, затем по id из общего
+    кэша (TOKEN_CACHE_SHARED) и только потом по токену в БД. В общем
+    кэше хранится только id пользователя, а не сам объект. Выход,
+    смена пароля и деактивация сбрасывают кэш после коммита
+    (см. api/signals.py); в кэшах других процессов запись живет
+    не дольше TOKEN_CACHE_LOCAL_TTL секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = get_token_digest(key)
+        user = local_token_cache.get(digest)
+        if user is None and settings.TOKEN_CACHE_SHARED:
+            user_id = cache.get(TOKEN_CACHE_KEY.format(digest=digest))
+            if user_id is not None:
+                user = get_user_model().objects.filter(pk=user_id).first()
+                if user is None:
+                    raise exceptions.AuthenticationFailed(
+                        _('Invalid token.')
+                    )
+                local_token_cache.set(
+                    digest, user, settings.TOKEN_CACHE_LOCAL_TTL
+                )
+        if user is None:
+            user, _token = super().authenticate_credentials(key)
+            local_token_cache.set(
+                digest, user, settings.TOKEN_CACHE_LOCAL_TTL
+            )
+            if settings.TOKEN_CACHE_SHARED:
+                cache.set(
+                    TOKEN_CACHE_KEY.format(digest=digest),
+                    user.pk,
+                    settings.TOKEN_CACHE_TTL
+                )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        # Каждый запрос получает свою копию: изменения request.user
+        # (например, set_password) не должны попадать в кэш.
+        user = copy.copy(user)
+        return user, self.get_model()(key=key, user=user)
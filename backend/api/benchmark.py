@@ -0,0 +1,238 @@
+import json
+import statistics
+import time
+
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipe.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+PNG_PIXEL = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfD'
+    'wAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+class BenchmarkError(Exception):
+    """Эндпоинт вернул неожиданный статус."""
+
+
+class Scenario:
+    """
+    Запрос к API: path форматируется значениями контекста
+    (см. build_context), data — функция, возвращающая тело запроса.
+    """
+
+    def __init__(self, name, path, method='get', data=None, status=200,
+                 authenticated=True):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.status = status
+        self.authenticated = authenticated
+
+
+def recipe_payload(context):
+    return {
+        'name': 'Рецепт для замеров',
+        'text': 'Смешать и подать.',
+        'cooking_time': 15,
+        'image': f'data:image/png;base64,{PNG_PIXEL}',
+        'tags': context['tag_ids'],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 100}
+            for ingredient_id in context['ingredient_ids']
+        ],
+    }
+
+
+RECIPES = '/api/recipes/?limit=10'
+
+SCENARIOS = (
+    Scenario('recipes_list_anonymous', RECIPES, authenticated=False),
+    Scenario('recipes_list', RECIPES),
+    Scenario('recipes_list_tags', RECIPES + '&tags={tag}&tags={other_tag}'),
+    Scenario('recipes_list_author', RECIPES + '&author={author}'),
+    Scenario('recipes_list_favorited', RECIPES + '&is_favorited=1'),
+    Scenario('recipes_list_in_cart', RECIPES + '&is_in_shopping_cart=1'),
+    Scenario(
+        'recipes_list_ingredients',
+        RECIPES + '&ingredients={ingredient}'
+                  '&exclude_ingredients={other_ingredient}'
+    ),
+    Scenario('recipes_list_search', RECIPES + '&search={word}'),
+    Scenario('recipes_list_popular', RECIPES + '&ordering=-favorites_count'),
+    Scenario('recipe_detail', '/api/recipes/{recipe}/'),
+    Scenario('subscriptions', '/api/users/subscriptions/?recipes_limit=3'),
+    Scenario('ingredients_autocomplete', '/api/ingredients/?name={prefix}'),
+    Scenario(
+        'download_shopping_cart',
+        '/api/recipes/download_shopping_cart/?format=txt'
+    ),
+    Scenario(
+        'favorite_add', '/api/recipes/{recipe}/favorite/',
+        method='post', status=201
+    ),
+    Scenario(
+        'favorite_remove', '/api/recipes/{recipe}/favorite/',
+        method='delete', status=204
+    ),
+    Scenario(
+        'recipe_create', '/api/recipes/',
+        method='post', data=recipe_payload, status=201
+    ),
+    Scenario(
+        'recipe_update', '/api/recipes/{own_recipe}/',
+        method='patch', data=recipe_payload
+    ),
+)
+
+
+def get_clients(user):
+    """Клиенты без авторизации и с токеном пользователя user."""
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return {False: APIClient(), True: client}
+
+
+def build_context(user, clients):
+    """
+    Подбирает значения для запросов по сгенерированным данным:
+    популярные теги и ингредиенты, самого популярного автора,
+    рецепт не из избранного пользователя и его собственный рецепт.
+    """
+    tags = list(Tag.objects.annotate(
+        recipes_total=Count('recipes')
+    ).order_by('-recipes_total', 'pk')[:2])
+    ingredient_ids = list(RecipeIngredient.objects.values(
+        'ingredient'
+    ).annotate(total=Count('pk')).order_by(
+        '-total', 'ingredient'
+    ).values_list('ingredient', flat=True)[:3])
+    ingredient = Ingredient.objects.get(pk=ingredient_ids[0])
+    context = {
+        'tag': tags[0].slug,
+        'other_tag': tags[-1].slug,
+        'tag_ids': [tag.pk for tag in tags],
+        'ingredient': ingredient_ids[0],
+        'other_ingredient': ingredient_ids[-1],
+        'ingredient_ids': ingredient_ids,
+        'word': ingredient.name.split()[0],
+        'prefix': ingredient.name[:2],
+        'author': User.objects.order_by('-followers_count', 'pk')[0].pk,
+        'recipe': Recipe.objects.exclude(favorites__user=user).order_by(
+            '-favorites_count', 'pk'
+        )[0].pk,
+    }
+    response = clients[True].post(
+        '/api/recipes/', recipe_payload(context), format='json'
+    )
+    context['own_recipe'] = response.data['id']
+    return context
+
+
+def get_benchmark_user():
+    """Пользователь с наибольшим числом рецептов в корзине."""
+    return User.objects.annotate(
+        carts_total=Count('shopping_carts')
+    ).order_by('-carts_total', 'pk')[0]
+
+
+def run_scenarios(clients, context, iterations, warmup=1):
+    """
+    Выполняет все сценарии по очереди iterations раз после warmup
+    прогревочных проходов и возвращает время (с) и число SQL-запросов
+    каждого выполнения.
+    """
+    samples = {
+        scenario.name: {'durations': [], 'queries': []}
+        for scenario in SCENARIOS
+    }
+    for iteration in range(warmup + iterations):
+        for scenario in SCENARIOS:
+            client = clients[scenario.authenticated]
+            data = scenario.data(context) if scenario.data else None
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(
+                    scenario.path.format(**context), data, format='json'
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                duration = time.perf_counter() - started
+            if response.status_code != scenario.status:
+                raise BenchmarkError(
+                    f'{scenario.name}: статус {response.status_code}, '
+                    f'ожидается {scenario.status}'
+                )
+            if iteration >= warmup:
+                samples[scenario.name]['durations'].append(duration)
+                samples[scenario.name]['queries'].append(len(queries))
+    return samples
+
+
+def summarize(samples):
+    """
+    Сводка по сценариям: наибольшее число запросов и перцентили
+    времени ответа в миллисекундах.
+    """
+    results = {}
+    for name, sample in samples.items():
+        durations = [duration * 1000 for duration in sample['durations']]
+        if len(durations) > 1:
+            percentiles = statistics.quantiles(
+                durations, n=100, method='inclusive'
+            )
+        else:
+            percentiles = durations * 99
+        results[name] = {
+            'queries': max(sample['queries']),
+            'p50_ms': round(percentiles[49], 2),
+            'p95_ms': round(percentiles[94], 2),
+            'p99_ms': round(percentiles[98], 2),
+        }
+    return results
+
+
+def compare(results, baseline, latency_tolerance):
+    """
+    Сравнивает результаты с базовыми. Возвращает превышения бюджета
+    SQL-запросов и замедления p95 больше чем в latency_tolerance раз.
+    """
+    over_budget = []
+    slower = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['queries'] > expected['queries']:
+            over_budget.append(
+                f'{name}: {result["queries"]} SQL-запросов, '
+                f'бюджет {expected["queries"]}'
+            )
+        if result['p95_ms'] > expected['p95_ms'] * latency_tolerance:
+            slower.append(
+                f'{name}: p95 {result["p95_ms"]} мс, '
+                f'базовое {expected["p95_ms"]} мс'
+            )
+    return over_budget, slower
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+        file.write('\n')
@@ -0,0 +1,148 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from recipe.versions import get_version
+
+from .compression import choose_encoding, get_precompressed
+from .metrics import observe_cache_result
+
+
+def get_query_digest(request):
+    """
+    Хэш адреса сервера (в ответах есть абсолютные ссылки)
+    и отсортированных параметров запроса.
+    """
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    raw_key = f'{request.build_absolute_uri("/")}|{params}'
+    return hashlib.md5(raw_key.encode()).hexdigest()
+
+
+def make_etag(*parts):
+    """
+    Строит ETag из значений, от которых зависит тело ответа.
+    ETag слабый: он один для несжатого и сжатых вариантов ответа
+    (см. CompressionMiddleware), которые побайтно различаются.
+    """
+    raw = ':'.join(str(part) for part in parts)
+    return 'W/' + quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_not_modified_response(request, etag):
+    """
+    Возвращает ответ 304, если If-None-Match запроса совпадает с etag,
+    иначе None.
+    """
+    response = get_conditional_response(request._request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+class VersionETagMixin:
+    """
+    Отвечает 304 на list и retrieve, если данные не менялись.
+    ETag строится из версии набора данных (меняется при записи,
+    см. recipe/signals.py) и запроса, поэтому проверка не обращается к БД.
+
+    С precompressed = True сжатые JSON-ответы кэшируются по ETag
+    (см. CompressionMiddleware): для справочников, одинаковых для всех
+    пользователей, повторный запрос не обращается к БД и не сжимает
+    ответ заново.
+    """
+    etag_version = None
+    precompressed = False
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = make_etag(
+            get_version(self.etag_version),
+            request.path,
+            request.accepted_renderer.format,
+            get_query_digest(request)
+        )
+        response = get_not_modified_response(request, etag)
+        if response is not None:
+            return response
+        precompressed_key = None
+        if self.precompressed and request.accepted_renderer.format == 'json':
+            precompressed_key = etag[len('W/'):].strip('"')
+            response = self.get_precompressed_response(
+                request, precompressed_key, etag
+            )
+            if response is not None:
+                return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response.precompressed_cache_key = precompressed_key
+        return response
+
+    @staticmethod
+    def get_precompressed_response(request, key, etag):
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        cached = get_precompressed(key, encoding) if encoding else None
+        if cached is None:
+            return None
+        content_type, content = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Encoding'] = encoding
+        response['Content-Length'] = str(len(content))
+        response['ETag'] = etag
+        return response
+
+
+class AnonymousListCacheMixin:
+    """
+    Кэширует ответы list для анонимных пользователей.
+    Ключ строится из версии данных (меняется при записи, см.
+    recipe/signals.py) и нормализованной строки запроса.
+    """
+    list_cache_name = None
+    list_cache_version = None
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        key = self.get_list_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            observe_cache_result(self.list_cache_name, hit=True)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        observe_cache_result(self.list_cache_name, hit=False)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def get_list_cache_key(self, request):
+        """
+        Строит ключ из версии данных и хэша запроса.
+        """
+        digest = get_query_digest(request)
+        version = get_version(self.list_cache_version)
+        return f'response_cache:{self.list_cache_name}:{version}:{digest}'
@@ -0,0 +1,124 @@
+import gzip
+import re
+import zlib
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Ответы из кэша сжимаются один раз, поэтому сильнее.
+PRECOMPRESSED_GZIP_LEVEL = 9
+PRECOMPRESSED_BROTLI_QUALITY = 11
+# Потоковое сжатие сбрасывает буфер компрессора не чаще, чем раз
+# на столько байт входа: сброс на каждой мелкой части ухудшает сжатие.
+STREAM_FLUSH_SIZE = 16 * 1024
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+PRECOMPRESSED_CACHE_KEY = 'precompressed:{key}:{encoding}'
+
+ACCEPT_ENCODING_RE = re.compile(
+    r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$'
+)
+
+
+def get_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    if brotli is None:
+        return ('gzip',)
+    return ('br', 'gzip')
+
+
+def choose_encoding(accept_encoding):
+    """
+    Выбирает кодировку по заголовку Accept-Encoding с учетом весов q.
+    При равных весах предпочитается brotli. Возвращает None, если
+    клиент не принимает ни одну из поддерживаемых кодировок.
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        match = ACCEPT_ENCODING_RE.match(item)
+        if match is None:
+            continue
+        name, weight = match.groups()
+        try:
+            weights[name.lower()] = float(weight) if weight else 1.0
+        except ValueError:
+            continue
+    default = weights.get('*', 0)
+    best, best_weight = None, 0
+    for encoding in get_encodings():
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible(content_type):
+    return content_type.split(';')[0].strip().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(content, encoding, precompressed=False):
+    if encoding == 'br':
+        return brotli.compress(content, quality=(
+            PRECOMPRESSED_BROTLI_QUALITY if precompressed else BROTLI_QUALITY
+        ))
+    return gzip.compress(content, compresslevel=(
+        PRECOMPRESSED_GZIP_LEVEL if precompressed else GZIP_LEVEL
+    ), mtime=0)
+
+
+def compress_stream(stream, encoding):
+    """
+    Сжимает поток по мере чтения. Сжатые данные отдаются, как только
+    на вход пришло STREAM_FLUSH_SIZE байт, без ожидания конца потока.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress_chunk = compressor.process
+        flush = compressor.flush
+        finish = compressor.finish
+    else:
+        # wbits 16 + MAX_WBITS — формат gzip с заголовком
+        # и контрольной суммой.
+        compressor = zlib.compressobj(
+            GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        compress_chunk = compressor.compress
+        flush = partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    pending = 0
+    for chunk in stream:
+        data = compress_chunk(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_SIZE:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
+
+
+def get_precompressed(key, encoding):
+    """Возвращает (content_type, сжатое тело) из кэша или None."""
+    return cache.get(PRECOMPRESSED_CACHE_KEY.format(
+        key=key, encoding=encoding
+    ))
+
+
+def set_precompressed(key, encoding, content_type, content):
+    cache.set(
+        PRECOMPRESSED_CACHE_KEY.format(key=key, encoding=encoding),
+        (content_type, content),
+        settings.RESPONSE_CACHE_TIMEOUT
+    )
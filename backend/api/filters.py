@@ -1,40 +1,119 @@
 import django_filters
-from django_filters.rest_framework import filters
-from recipe.models import Ingredient, Recipe
+from django import forms
+from django.db.models import Exists, OuterRef
+from recipe.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                           ShoppingCart)
+from recipe.search import search_recipes
+
+
+class MultipleValueField(forms.TypedMultipleChoiceField):
+    """
+    Поле со списком значений без фиксированного набора вариантов:
+    значения не сверяются со справочником в БД.
+    """
+
+    def valid_value(self, value):
+        return True
+
+
+class MultipleValueFilter(django_filters.MultipleChoiceFilter):
+    """Фильтр по повторяющемуся параметру запроса."""
+    field_class = MultipleValueField
 
 
 class RecipeFilter(django_filters.FilterSet):
-    """Фильтр для модели Recipe."""
+    """
+    Фильтр для модели Recipe.
+    Фильтры по связанным таблицам строятся на коррелированных
+    подзапросах EXISTS, поэтому не размножают строки и не требуют
+    DISTINCT.
+    """
     author = django_filters.NumberFilter(field_name='author__id')
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = MultipleValueFilter(method='filter_tags')
+    ingredients = MultipleValueFilter(
+        coerce=int, method='filter_ingredients'
+    )
+    exclude_ingredients = MultipleValueFilter(
+        coerce=int, method='filter_exclude_ingredients'
+    )
     is_favorited = django_filters.rest_framework.filters.BooleanFilter(
         method='filter_is_favorited'
     )
     is_in_shopping_cart = django_filters.rest_framework.filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = django_filters.CharFilter(method='filter_search')
+    ordering = django_filters.OrderingFilter(
+        fields=('favorites_count', 'in_carts_count', 'id'),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'ingredients', 'exclude_ingredients',
+            'is_favorited', 'is_in_shopping_cart', 'search', 'ordering'
+        )
+
+    def filter_tags(self, queryset, name, value):
+        """Оставляет рецепты с любым из тегов по slug."""
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'), tag__slug__in=value
+            )
+        ))
+
+    def filter_ingredients(self, queryset, name, value):
+        """Оставляет рецепты, в которых есть все указанные ингредиенты."""
+        for ingredient_id in set(value):
+            queryset = queryset.filter(Exists(
+                RecipeIngredient.objects.filter(
+                    recipe=OuterRef('pk'), ingredient_id=ingredient_id
+                )
+            ))
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        """Исключает рецепты с любым из указанных ингредиентов."""
+        return queryset.filter(~Exists(
+            RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk'), ingredient_id__in=value
+            )
+        ))
 
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрует рецепты по статусу 'в избранном'."""
-        user = self.request.user
-        if user.is_anonymous:
-            return queryset
-        if value:
-            return queryset.filter(favorites__user=user)
-        return queryset.exclude(favorites__user=user)
+        return self.filter_user_relation(queryset, Favorite, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """Фильтрует рецепты по статусу 'в корзине покупок'."""
+        return self.filter_user_relation(queryset, ShoppingCart, value)
+
+    def filter_user_relation(self, queryset, model, value):
+        """
+        Оставляет рецепты, которые есть (или которых нет) в избранном
+        либо корзине текущего пользователя.
+        """
         user = self.request.user
         if user.is_anonymous:
             return queryset
-        if value:
-            return queryset.filter(shopping_carts__user=user)
-        return queryset.exclude(shopping_carts__user=user)
+        related = Exists(
+            model.objects.filter(user=user, recipe=OuterRef('pk'))
+        )
+        return queryset.filter(related if value else ~related)
+
+    def filter_search(self, queryset, name, value):
+        """
+        Ищет рецепты по названию и тексту, упорядочивая по релевантности.
+        """
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Сортирует рецепты по счетчикам популярности, при равенстве
+        сначала новые. Пагинация по курсору сохраняет порядок по id.
+        """
+        return queryset.order_by(*value, '-id')
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmark import (BenchmarkError, build_context, compare,
+                           get_benchmark_user, get_clients, load_baseline,
+                           run_scenarios, save_baseline, summarize)
+from recipe.dataset import DatasetGenerator
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'benchmark_baseline.json'
+)
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    """
+    Команда для замеров основных эндпоинтов API на тестовой базе
+    с синтетическими данными. Число SQL-запросов сравнивается
+    с бюджетом из api/benchmark_baseline.json: превышение — ошибка,
+    так регрессии N+1 находятся до выкладки.
+    """
+    help = "Замеряет время ответа и число SQL-запросов эндпоинтов API"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Число замеров каждого эндпоинта.'
+        )
+        parser.add_argument(
+            '--users', type=int, default=200,
+            help='Число пользователей в тестовых данных.'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=2000,
+            help='Число рецептов в тестовых данных.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора тестовых данных.'
+        )
+        parser.add_argument(
+            '--baseline', default=BASELINE_PATH,
+            help='Файл с базовыми результатами.'
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Записать результаты как базовые.'
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=2.0,
+            help='Во сколько раз p95 может превышать базовое значение.'
+        )
+        parser.add_argument(
+            '--fail-on-latency', action='store_true',
+            help='Считать ошибкой и замедление, а не только '
+                 'превышение бюджета запросов.'
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(
+                CACHES=BENCHMARK_CACHES,
+                MEDIA_ROOT=media_root,
+                PERFORMANCE_LOG_SAMPLE_RATE=0,
+            ):
+                results = self.run_benchmark(options)
+        except BenchmarkError as error:
+            raise CommandError(error)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.report(results)
+        if options['update_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(f'Базовые результаты записаны в '
+                              f'{options["baseline"]}')
+            return
+        self.check_budgets(results, options)
+
+    def run_benchmark(self, options):
+        self.stdout.write('Создание тестовых данных...')
+        DatasetGenerator(seed=options['seed']).generate(
+            users=options['users'], recipes=options['recipes']
+        )
+        clients = get_clients(get_benchmark_user())
+        context = build_context(get_benchmark_user(), clients)
+        samples = run_scenarios(clients, context, options['iterations'])
+        return summarize(samples)
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"эндпоинт":<28}{"SQL":>5}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"p99, мс":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<28}{result["queries"]:>5}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}{result["p99_ms"]:>10}'
+            )
+
+    def check_budgets(self, results, options):
+        baseline = load_baseline(options['baseline'])
+        missing = sorted(set(results) - set(baseline))
+        if missing:
+            self.stdout.write(f'Нет базовых значений: {", ".join(missing)}')
+        over_budget, slower = compare(
+            results, baseline, options['latency_tolerance']
+        )
+        for message in slower:
+            self.stderr.write(f'Замедление: {message}')
+        for message in over_budget:
+            self.stderr.write(f'Превышен бюджет: {message}')
+        if over_budget or (slower and options['fail_on_latency']):
+            raise CommandError(
+                f'Превышений бюджета запросов: {len(over_budget)}, '
+                f'замедлений: {len(slower)}'
+            )
+        self.stdout.write('Все эндпоинты укладываются в бюджет запросов.')
@@ -0,0 +1,96 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeFastReadSerializer, RecipeReadSerializer
+from recipe.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Команда для сравнения сериализации рецептов через поля DRF
+    (RecipeReadSerializer) и напрямую (RecipeFastReadSerializer).
+    Перед замерами проверяет, что ответы совпадают байт в байт.
+    """
+    help = "Сравнивает скорость сериализаторов рецептов для чтения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Число рецептов в выборке (как страница списка).'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Число повторов сериализации выборки.'
+        )
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя, от имени которого строится ответ.'
+        )
+
+    def handle(self, *args, **options):
+        # Запрос строится APIRequestFactory с хостом testserver:
+        # без него в ALLOWED_HOSTS ссылки на картинки не построить.
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            self.run_benchmark(options)
+
+    def run_benchmark(self, options):
+        user = AnonymousUser()
+        if options['user'] is not None:
+            try:
+                user = User.objects.get(pk=options['user'])
+            except User.DoesNotExist:
+                raise CommandError('Пользователь не найден.')
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        context = {'request': request}
+        recipes = list(
+            Recipe.objects.with_user_flags(user).with_related(user)
+            .order_by('-id')[:options['recipes']]
+        )
+        if not recipes:
+            raise CommandError('В базе нет рецептов.')
+
+        renderer = JSONRenderer()
+        expected = renderer.render(
+            RecipeReadSerializer(recipes, many=True, context=context).data
+        )
+        actual = renderer.render(
+            RecipeFastReadSerializer(recipes, many=True, context=context).data
+        )
+        if actual != expected:
+            raise CommandError(
+                'Ответы сериализаторов различаются: '
+                'RecipeFastReadSerializer нужно исправить.'
+            )
+
+        timings = {}
+        for serializer_class in (
+            RecipeReadSerializer, RecipeFastReadSerializer
+        ):
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                serializer_class(recipes, many=True, context=context).data
+            timings[serializer_class] = time.perf_counter() - started
+
+        count = len(recipes) * options['repeat']
+        read_time = timings[RecipeReadSerializer]
+        fast_time = timings[RecipeFastReadSerializer]
+        self.stdout.write(
+            f'Рецептов: {len(recipes)}, повторов: {options["repeat"]}, '
+            f'размер ответа: {len(expected)} байт\n'
+            f'RecipeReadSerializer: {read_time / count * 1e6:.1f} мкс '
+            f'на рецепт\n'
+            f'RecipeFastReadSerializer: {fast_time / count * 1e6:.1f} мкс '
+            f'на рецепт\n'
+            f'Ускорение: {read_time / fast_time:.1f}x'
+        )
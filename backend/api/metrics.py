@@ -0,0 +1,93 @@
+import os
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса.',
+    ('view', 'method'),
+)
+REQUESTS = Counter(
+    'foodgram_requests',
+    'Число обработанных запросов.',
+    ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Число SQL-запросов на один запрос.',
+    ('view',),
+    buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'foodgram_request_db_duration_seconds',
+    'Суммарное время SQL-запросов на один запрос.',
+    ('view',),
+)
+RESPONSE_CACHE_HITS = Counter(
+    'foodgram_response_cache_hits',
+    'Попадания в кэш ответов.',
+    ('cache',),
+)
+RESPONSE_CACHE_MISSES = Counter(
+    'foodgram_response_cache_misses',
+    'Промахи кэша ответов.',
+    ('cache',),
+)
+SHOPPING_LIST_EXPORT_DURATION = Histogram(
+    'foodgram_shopping_list_export_seconds',
+    'Время выгрузки списка покупок от первого до последнего байта.',
+    ('format',),
+)
+
+
+def observe_request(stats, method, status):
+    """Записывает метрики запроса по замерам PerformanceMiddleware."""
+    view = stats['view'] or 'unresolved'
+    REQUEST_LATENCY.labels(view, method).observe(stats['total'])
+    REQUESTS.labels(view, method, status).inc()
+    REQUEST_QUERIES.labels(view).observe(stats['queries'])
+    REQUEST_DB_DURATION.labels(view).observe(stats['db'])
+
+
+def observe_cache_result(cache_name, hit):
+    """Учитывает попадание или промах кэша ответов cache_name."""
+    counter = RESPONSE_CACHE_HITS if hit else RESPONSE_CACHE_MISSES
+    counter.labels(cache_name).inc()
+
+
+def observe_export(stream, export_format):
+    """
+    Оборачивает поток файла списка покупок и замеряет время
+    его выгрузки, включая запросы к БД по мере чтения строк.
+    """
+    started = time.perf_counter()
+    try:
+        yield from stream
+    finally:
+        SHOPPING_LIST_EXPORT_DURATION.labels(export_format).observe(
+            time.perf_counter() - started
+        )
+
+
+def get_registry():
+    """
+    Реестр метрик процесса. Под gunicorn (PROMETHEUS_MULTIPROC_DIR
+    задан в gunicorn.conf.py) значения каждого воркера пишутся в файлы
+    общего каталога и суммируются при сборе, поэтому ответ не зависит
+    от того, какой воркер принял запрос.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """Возвращает метрики в текстовом формате Prometheus."""
+    return CONTENT_TYPE_LATEST, generate_latest(get_registry())
@@ -0,0 +1,209 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .compression import (choose_encoding, compress, compress_stream,
+                          is_compressible, set_precompressed)
+from .metrics import observe_request
+
+logger = logging.getLogger('foodgram.performance')
+
+
+class QueryCollector:
+    """
+    Обертка выполнения SQL (connection.execute_wrapper): считает
+    запросы, их суммарное время и сохраняет текст первых
+    PERFORMANCE_MAX_LOGGED_QUERIES запросов.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if len(self.queries) < settings.PERFORMANCE_MAX_LOGGED_QUERIES:
+                self.queries.append({
+                    'sql': sql,
+                    'duration_ms': round(duration * 1000, 2),
+                })
+
+
+def get_view_name(view_func, method):
+    """
+    Возвращает имя обработчика вида RecipeViewSet.list
+    для вьюсетов DRF и полное имя функции для остальных view.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__qualname__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет для каждого запроса общее время, число и время SQL-запросов,
+    время обработчика и отрисовки ответа, размер ответа.
+    Результаты отдаются в заголовке Server-Timing (PERFORMANCE_SERVER_TIMING),
+    попадают в метрики Prometheus (/api/metrics) и пишутся в лог
+    foodgram.performance: выборочно (PERFORMANCE_LOG_SAMPLE_RATE)
+    и всегда — для медленных запросов или запросов с большим числом SQL
+    вместе с текстом запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        collector = QueryCollector()
+        request.performance = {'view': None}
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        stats = request.performance
+        stats['total'] = finished - started
+        stats['db'] = collector.duration
+        stats['queries'] = collector.count
+        if 'view_finished' in stats:
+            stats['handler'] = stats['view_finished'] - stats['view_started']
+            stats['render'] = finished - stats['view_finished']
+        stats['size'] = (
+            None if response.streaming else len(response.content)
+        )
+
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = self.get_server_timing(stats)
+        observe_request(stats, request.method, response.status_code)
+        self.log(request, response, stats, collector)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.performance['view'] = get_view_name(view_func, request.method)
+        request.performance['view_started'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """
+        Вызывается после обработчика и до отрисовки ответа DRF,
+        отделяя время сериализации в байты от времени обработчика.
+        """
+        request.performance['view_finished'] = time.perf_counter()
+        return response
+
+    @staticmethod
+    def get_server_timing(stats):
+        metrics = [
+            f'total;dur={stats["total"] * 1000:.1f}',
+            f'db;dur={stats["db"] * 1000:.1f};'
+            f'desc="{stats["queries"]} queries"',
+        ]
+        if 'handler' in stats:
+            metrics.append(f'view;dur={stats["handler"] * 1000:.1f}')
+            metrics.append(
+                f'render;dur={stats["render"] * 1000:.1f};desc="Serialization"'
+            )
+        return ', '.join(metrics)
+
+    @staticmethod
+    def log(request, response, stats, collector):
+        slow = (
+            stats['total'] * 1000 >= settings.PERFORMANCE_SLOW_REQUEST_MS
+            or stats['queries'] >= settings.PERFORMANCE_SLOW_REQUEST_QUERIES
+        )
+        if not slow and (
+            random.random() >= settings.PERFORMANCE_LOG_SAMPLE_RATE
+        ):
+            return
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': stats['view'],
+            'status': response.status_code,
+            'total_ms': round(stats['total'] * 1000, 2),
+            'db_ms': round(stats['db'] * 1000, 2),
+            'queries': stats['queries'],
+            'view_ms': None,
+            'render_ms': None,
+            'size': stats['size'],
+        }
+        if 'handler' in stats:
+            record['view_ms'] = round(stats['handler'] * 1000, 2)
+            record['render_ms'] = round(stats['render'] * 1000, 2)
+        if slow:
+            record['sql'] = collector.queries
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip или brotli (если установлен пакет Brotli),
+    выбирая кодировку по заголовку Accept-Encoding. Сжимаются только
+    текстовые ответы не короче COMPRESSION_MIN_SIZE байт, потоковые —
+    по частям. Если у ответа есть precompressed_cache_key
+    (см. VersionETagMixin), сжатое тело сохраняется в кэш, и следующие
+    такие же запросы отдаются из него без сериализации и сжатия.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '')
+        if not is_compressible(content_type):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.has_header('Content-Encoding'):
+            return response
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            key = getattr(response, 'precompressed_cache_key', None)
+            content = compress(
+                response.content, encoding, precompressed=key is not None
+            )
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+            if key is not None:
+                set_precompressed(key, encoding, content_type, content)
+
+        response['Content-Encoding'] = encoding
+        # Сжатое тело отличается побайтно, поэтому ETag становится слабым,
+        # как в django.middleware.gzip.GZipMiddleware.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
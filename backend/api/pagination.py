@@ -1,4 +1,7 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from foodgram.constants import DEFAULT_PAGE_SIZE
 
@@ -6,3 +9,92 @@ from foodgram.constants import DEFAULT_PAGE_SIZE
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = DEFAULT_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Пагинация по курсору: страница выбирается условием по id
+    без OFFSET и без подсчета общего числа рецептов.
+    """
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    page_size = DEFAULT_PAGE_SIZE
+
+    def decode_cursor(self, request):
+        """
+        Пустой параметр cursor означает первую страницу.
+        """
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
+class RecipePagination(CustomPageNumberPagination):
+    """
+    Постраничная пагинация рецептов. При наличии параметра cursor
+    переключается в режим пагинации по курсору.
+    """
+    cursor_query_param = RecipeCursorPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(BasePagination):
+    """
+    Пагинация ленты по ключу: параметр before — id последнего рецепта
+    предыдущей страницы. Страница выбирается условием id < before
+    без OFFSET и подсчета общего числа записей.
+    """
+    before_query_param = 'before'
+    page_size_query_param = 'limit'
+    page_size = DEFAULT_PAGE_SIZE
+    max_page_size = 100
+
+    def paginate_ids(self, get_ids, request):
+        """
+        Возвращает id рецептов страницы. get_ids(before, limit)
+        выбирает не больше limit id, меньших before.
+        """
+        self.request = request
+        before = self.get_int_param(request, self.before_query_param)
+        limit = min(
+            self.get_int_param(request, self.page_size_query_param)
+            or self.page_size,
+            self.max_page_size
+        )
+        ids = get_ids(before, limit + 1)
+        self.has_next = len(ids) > limit
+        self.page_ids = ids[:limit]
+        return self.page_ids
+
+    @staticmethod
+    def get_int_param(request, name):
+        try:
+            value = int(request.query_params[name])
+        except (KeyError, ValueError):
+            return None
+        return value if value > 0 else None
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.before_query_param,
+            self.page_ids[-1]
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
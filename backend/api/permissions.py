@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 from rest_framework.permissions import (BasePermission,
                                         IsAuthenticatedOrReadOnly)
@@ -23,3 +26,23 @@ class UserPermission(BasePermission):
         if view.action == 'me':
             return request.user.is_authenticated
         return True
+
+
+class IsStaffOrMetricsToken(BasePermission):
+    """
+    Доступ для администраторов или по заголовку
+    Authorization: Bearer <METRICS_TOKEN>, с которым ходит Prometheus.
+    Без заданного METRICS_TOKEN доступ только у администраторов.
+    """
+    def has_permission(self, request, view):
+        if request.user.is_staff:
+            return True
+        token = settings.METRICS_TOKEN
+        if not token:
+            return False
+        keyword, _, credentials = request.META.get(
+            'HTTP_AUTHORIZATION', ''
+        ).partition(' ')
+        return keyword == 'Bearer' and hmac.compare_digest(
+            credentials.strip().encode(), token.encode()
+        )
@@ -0,0 +1,267 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+
+PDF_PAGE_WIDTH = 595
+PDF_PAGE_HEIGHT = 842
+PDF_MARGIN = 56
+PDF_FONT_SIZE = 12
+PDF_LEADING = 18
+PDF_LINES_PER_PAGE = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+
+# Кириллица передается в кодировке cp1251, а шрифт получает таблицу
+# Differences с именами глифов Adobe (afii100xx) для этих кодов.
+PDF_CYRILLIC_GLYPHS = (
+    [(0xA8, 'afii10023'), (0xB8, 'afii10071')]
+    + [
+        (0xC0 + index, f'afii{number}')
+        for index, number in enumerate(
+            list(range(10017, 10023)) + list(range(10024, 10050))
+        )
+    ]
+    + [
+        (0xE0 + index, f'afii{number}')
+        for index, number in enumerate(
+            list(range(10065, 10071)) + list(range(10072, 10098))
+        )
+    ]
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson, если пакет установлен, иначе — стандартный
+    JSONRenderer DRF. Как и JSONRenderer, пишет компактно, без
+    экранирования кириллицы, а даты и прочие типы, которых нет в JSON,
+    преобразует кодировщиком DRF. Ответы с отступами (indent
+    в заголовке Accept) и данные, которые orjson не поддерживает
+    (например, целые больше 64 бит), отдаются стандартным рендерером.
+    Вывод отличается от JSONRenderer только для чисел с плавающей
+    точкой: экспонента пишется без знака плюс (1e16, а не 1e+16),
+    а NaN и бесконечности становятся null вместо ошибки.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None
+            or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=(
+                    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                )
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Как и JSONRenderer, экранирует разделители строк,
+        # недопустимые в строках JavaScript.
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    """
+    Базовый рендерер выгрузки списка покупок.
+    Сам список формируется генератором stream(), ответы с ошибками
+    отдаются в виде JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    @abstractmethod
+    def stream(self, items):
+        """
+        Генерирует содержимое файла по строкам списка покупок.
+        Каждая строка — словарь с ключами name, measurement_unit
+        и total_amount.
+        """
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    """Выгрузка списка покупок в текстовом формате."""
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        yield f'{SHOPPING_LIST_TITLE}:\n\n'
+        for item in items:
+            yield (
+                f"{item['name']} ({item['measurement_unit']}): "
+                f"{item['total_amount']}\n"
+            )
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку для csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """Выгрузка списка покупок в формате CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in items:
+            yield writer.writerow((
+                item['name'], item['measurement_unit'], item['total_amount']
+            ))
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    """Выгрузка списка покупок в формате JSON."""
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, items):
+        separator = '['
+        for item in items:
+            yield separator + json.dumps({
+                'name': item['name'],
+                'measurement_unit': item['measurement_unit'],
+                'amount': item['total_amount'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    Выгрузка списка покупок в виде простого PDF для печати.
+    Документ пишется постранично, в памяти хранится только текущая
+    страница и смещения объектов для таблицы xref.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, items):
+        offsets = {}
+        position = 0
+
+        def write_object(number, body):
+            nonlocal position
+            offsets[number] = position
+            chunk = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+            position += len(chunk)
+            return chunk
+
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        position += len(header)
+        yield header
+        yield write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        differences = b' '.join(
+            b'%d /%s' % (code, name.encode()) for code, name
+            in PDF_CYRILLIC_GLYPHS
+        )
+        yield write_object(3, (
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            b'/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            b'/Differences [' + differences + b'] >> >>'
+        ))
+
+        page_numbers = []
+        next_number = 4
+        for lines in self.paginate(items):
+            page_number, content_number = next_number, next_number + 1
+            next_number += 2
+            page_numbers.append(page_number)
+            yield write_object(page_number, (
+                b'<< /Type /Page /Parent 2 0 R '
+                b'/MediaBox [0 0 %d %d] ' % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT)
+                + b'/Resources << /Font << /F1 3 0 R >> >> '
+                b'/Contents %d 0 R >>' % content_number
+            ))
+            content = self.page_content(lines)
+            yield write_object(content_number, (
+                b'<< /Length %d >>\nstream\n' % len(content)
+                + content + b'\nendstream'
+            ))
+
+        kids = b' '.join(b'%d 0 R' % number for number in page_numbers)
+        yield write_object(2, (
+            b'<< /Type /Pages /Kids [' + kids
+            + b'] /Count %d >>' % len(page_numbers)
+        ))
+
+        xref = [b'xref\n0 %d\n' % next_number, b'0000000000 65535 f \n']
+        xref += [
+            b'%010d 00000 n \n' % offsets[number]
+            for number in range(1, next_number)
+        ]
+        yield b''.join(xref) + (
+            b'trailer\n<< /Size %d /Root 1 0 R >>\n' % next_number
+            + b'startxref\n%d\n%%%%EOF\n' % position
+        )
+
+    @staticmethod
+    def paginate(items):
+        """Разбивает строки списка покупок на страницы."""
+        lines = [SHOPPING_LIST_TITLE, '']
+        for item in items:
+            lines.append(
+                f"{item['name']} ({item['measurement_unit']}): "
+                f"{item['total_amount']}"
+            )
+            if len(lines) == PDF_LINES_PER_PAGE:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+
+    @staticmethod
+    def page_content(lines):
+        """Формирует поток команд для вывода строк одной страницы."""
+        commands = [
+            b'BT /F1 %d Tf %d TL %d %d Td' % (
+                PDF_FONT_SIZE, PDF_LEADING,
+                PDF_MARGIN, PDF_PAGE_HEIGHT - PDF_MARGIN
+            )
+        ]
+        for line in lines:
+            text = line.encode('cp1251', errors='replace')
+            text = text.replace(b'\\', b'\\\\').replace(
+                b'(', b'\\('
+            ).replace(b')', b'\\)')
+            commands.append(b'(' + text + b') Tj T*')
+        commands.append(b'ET')
+        return b'\n'.join(commands)
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+)
@@ -1,14 +1,32 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.encoding import iri_to_uri
+from django.utils.functional import cached_property
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from recipe.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                           ShoppingCart, Tag)
+                           ShoppingCart, ShoppingListItem, Tag)
 from users.models import Subscription
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """
+    Возвращает значение параметра recipes_limit или None,
+    если параметр не передан или некорректен.
+    """
+    if request is None:
+        return None
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Кастомный сериализатор для отображения пользователя.
@@ -29,7 +47,10 @@ class UserSerializer(serializers.ModelSerializer):
         """
         Определяет, подписан ли текущий пользователь на данного пользователя.
         Возвращает True, если подписан, и False, если нет.
+        Использует аннотацию is_subscribed, если она есть в queryset.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (
             request
@@ -79,8 +100,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения ингредиента и его количества в рецепте."""
     id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
+        source='ingredient', read_only=True
     )
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
@@ -92,6 +112,19 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для записи ингредиента и его количества в рецепте.
+    Существование ингредиентов проверяется одним запросом
+    в RecipeWriteSerializer.
+    """
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'amount')
+
+
 class RecipeSimpleSerializer(serializers.ModelSerializer):
     """
     Сериализатор для краткого отображения рецептов.
@@ -129,6 +162,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_favorited(self, obj):
         """Возвращает True, если рецепт в избранном у пользователя."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request
@@ -138,6 +173,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Возвращает True, если рецепт в корзине у пользователя."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (
             request
@@ -148,12 +185,95 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
+def get_file_url_builder(request):
+    """
+    Возвращает функцию, строящую URL файла так же, как ImageField DRF
+    (request.build_absolute_uri(file.url)), но без разбора адреса
+    сервера для каждого файла.
+    """
+    if request is None:
+        return lambda file: file.url
+    scheme_host = request.build_absolute_uri('/')[:-1]
+
+    def build(file):
+        url = file.url
+        if (
+            url.startswith('/') and not url.startswith('//')
+            and '/./' not in url and '/../' not in url
+        ):
+            return iri_to_uri(scheme_host + url)
+        return request.build_absolute_uri(url)
+    return build
+
+
+class RecipeFastReadSerializer(RecipeReadSerializer):
+    """
+    Сериализатор для чтения рецептов в списках и карточке рецепта.
+    Ответ совпадает с RecipeReadSerializer байт в байт, но строится
+    напрямую из атрибутов рецепта и предзагруженных связей, минуя
+    поля DRF. Рецепты должны быть загружены с with_user_flags
+    и with_related, иначе флаги и связи читаются отдельными запросами.
+    """
+
+    @cached_property
+    def build_file_url(self):
+        return get_file_url_builder(self.context.get('request'))
+
+    def to_representation(self, instance):
+        build_file_url = self.build_file_url
+        author = instance.author
+        is_subscribed = getattr(author, 'is_subscribed', None)
+        if is_subscribed is None:
+            is_subscribed = UserSerializer(
+                context=self.context
+            ).get_is_subscribed(author)
+        is_favorited = getattr(instance, 'is_favorited', None)
+        if is_favorited is None:
+            is_favorited = self.get_is_favorited(instance)
+        is_in_shopping_cart = getattr(instance, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is None:
+            is_in_shopping_cart = self.get_is_in_shopping_cart(instance)
+        return {
+            'id': instance.id,
+            'name': instance.name,
+            'image': (
+                build_file_url(instance.image) if instance.image else None
+            ),
+            'text': instance.text,
+            'cooking_time': instance.cooking_time,
+            'author': {
+                'id': author.id,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'email': author.email,
+                'is_subscribed': is_subscribed,
+                'avatar': (
+                    build_file_url(author.avatar) if author.avatar else None
+                ),
+            },
+            'tags': [
+                {'id': tag.id, 'name': tag.name, 'slug': tag.slug}
+                for tag in instance.tags.all()
+            ],
+            'ingredients': [
+                {
+                    'id': item.ingredient_id,
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in instance.recipe_ingredients.all()
+            ],
+            'is_favorited': is_favorited,
+            'is_in_shopping_cart': is_in_shopping_cart,
+        }
+
+
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для записи рецепта."""
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
-    ingredients = RecipeIngredientSerializer(many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = RecipeIngredientWriteSerializer(many=True)
     image = Base64ImageField(required=True)
 
     class Meta:
@@ -196,6 +316,42 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         return data
 
+    def validate_tags(self, value):
+        """
+        Заменяет id тегов объектами, загружая их одним запросом.
+        """
+        return self.get_objects_by_ids(
+            Tag, value, 'Теги с id {ids} не существуют.'
+        )
+
+    def validate_ingredients(self, value):
+        """
+        Заменяет id ингредиентов объектами, загружая их одним запросом.
+        """
+        ingredients = self.get_objects_by_ids(
+            Ingredient, [item['id'] for item in value],
+            'Ингредиенты с id {ids} не существуют.'
+        )
+        return [
+            {'ingredient': ingredient, 'amount': item['amount']}
+            for ingredient, item in zip(ingredients, value)
+        ]
+
+    @staticmethod
+    def get_objects_by_ids(model, ids, error_message):
+        """
+        Загружает объекты модели по списку id одним запросом IN
+        с сохранением порядка. Сообщает обо всех отсутствующих id сразу.
+        """
+        objects = model.objects.in_bulk(ids)
+        missing_ids = sorted(set(ids) - objects.keys())
+        if missing_ids:
+            raise serializers.ValidationError(error_message.format(
+                ids=', '.join(map(str, missing_ids))
+            ))
+        return [objects[pk] for pk in ids]
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создает рецепт с указанными ингредиентами и тегами."""
         ingredients_data = validated_data.pop('ingredients')
@@ -211,20 +367,90 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Обновляет рецепт с новыми ингредиентами и тегами."""
+        """
+        Обновляет рецепт с новыми ингредиентами и тегами.
+        Изменяются только отличающиеся строки связующих таблиц.
+        """
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
 
         super().update(instance, validated_data)
 
-        instance.tags.set(tags_data)
-
-        instance.ingredients.clear()
-        self.create_ingredients(instance, ingredients_data)
+        self.update_tags(instance, tags_data)
+        self.update_ingredients(instance, ingredients_data)
 
         return instance
 
+    @staticmethod
+    def update_tags(recipe, tags_data):
+        """Добавляет новые и удаляет убранные теги рецепта."""
+        recipe_tags = Recipe.tags.through.objects.filter(recipe=recipe)
+        existing_ids = set(recipe_tags.values_list('tag_id', flat=True))
+        new_ids = {tag.id for tag in tags_data}
+
+        removed_ids = existing_ids - new_ids
+        if removed_ids:
+            recipe_tags.filter(tag_id__in=removed_ids).delete()
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for tag_id in new_ids - existing_ids
+        ])
+
+    @staticmethod
+    def update_ingredients(recipe, ingredients_data):
+        """
+        Сравнивает новый список ингредиентов с сохраненным и выполняет
+        только нужные INSERT, UPDATE количества и DELETE.
+        Разница переносится в списки покупок пользователей, при изменении
+        состава рецепт помечается для пересчета похожих рецептов.
+        """
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        deltas = {}
+        for ingredient_data in ingredients_data:
+            amount = ingredient_data['amount']
+            recipe_ingredient = existing.pop(
+                ingredient_data['ingredient'].id, None
+            )
+            if recipe_ingredient is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient_data['ingredient'],
+                    amount=amount
+                ))
+                deltas[ingredient_data['ingredient'].id] = amount
+            elif recipe_ingredient.amount != amount:
+                deltas[recipe_ingredient.ingredient_id] = (
+                    amount - recipe_ingredient.amount
+                )
+                recipe_ingredient.amount = amount
+                recipe_ingredient.updated_at = now
+                to_update.append(recipe_ingredient)
+        for ingredient_id, recipe_ingredient in existing.items():
+            deltas[ingredient_id] = -recipe_ingredient.amount
+
+        if existing:
+            RecipeIngredient.objects.filter(
+                pk__in=[item.pk for item in existing.values()]
+            ).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(
+                to_update, ('amount', 'updated_at')
+            )
+        RecipeIngredient.objects.bulk_create(to_create)
+        ShoppingListItem.objects.apply_recipe_changes(recipe.id, deltas)
+        if existing or to_create:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                similar_recipes_stale=True
+            )
+
     @staticmethod
     def create_ingredients(recipe, ingredients_data):
         """Создает ингредиенты для рецепта."""
@@ -242,8 +468,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """
         Возвращает данные рецепта в формате, подходящем для чтения.
+        Рецепт перечитывается с аннотациями и связанными объектами,
+        чтобы число запросов не зависело от числа ингредиентов.
         """
-        return RecipeReadSerializer(instance, context=self.context).data
+        user = self.context['request'].user
+        instance = Recipe.objects.with_user_flags(user).with_related(
+            user
+        ).get(pk=instance.pk)
+        return RecipeFastReadSerializer(instance, context=self.context).data
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -290,6 +522,14 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         model = ShoppingCart
         fields = ('recipe',)
 
+    @transaction.atomic
+    def create(self, validated_data):
+        """
+        Добавляет рецепт в корзину в одной транзакции
+        с обновлением списка покупок.
+        """
+        return super().create(validated_data)
+
     def validate(self, data):
         """
         Проверка на наличие дубликатов рецептов в корзине.
@@ -316,6 +556,16 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         ).data
 
 
+class PantrySearchSerializer(serializers.Serializer):
+    """
+    Сериализатор параметров поиска рецептов по имеющимся продуктам.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Subscription.
@@ -334,17 +584,15 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     def get_recipes(self, obj):
         """
         Возвращает рецепты пользователя, на которого подписан.
+        Использует рецепты, предзагруженные с учетом recipes_limit,
+        если они есть.
         """
-        recipes = obj.subscribed_to.recipes.all()
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-
-        if recipes_limit is not None:
-            try:
-                recipes_limit = int(recipes_limit)
+        recipes = getattr(obj.subscribed_to, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.subscribed_to.recipes.order_by('-id')
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
                 recipes = recipes[:recipes_limit]
-            except ValueError:
-                pass
 
         return RecipeSimpleSerializer(
             recipes, many=True, context=self.context
@@ -354,7 +602,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         """
         Возвращает количество рецептов пользователя.
         """
-        return obj.subscribed_to.recipes.count()
+        return obj.subscribed_to.recipes_count
 
     def to_representation(self, instance):
         """
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш после коммита удаления токена (выход, удаление
+    пользователя), чтобы параллельный запрос не вернул в кэш старую
+    запись до коммита.
+    """
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Сбрасывает кэш токенов пользователя при любом изменении (смена
+    пароля, деактивация, профиль), кроме обновления last_login.
+    Кэш сбрасывается после коммита, как и при удалении токена.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+
+    def invalidate():
+        for key in keys:
+            invalidate_token(key)
+
+    transaction.on_commit(invalidate)
@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (IngredientViewSet, RecipeViewSet, SubscriptionViewSet,
-                    TagViewSet, UserViewSet, redirect_to_recipe)
+                    TagViewSet, UserViewSet, metrics, redirect_to_recipe)
 
 app_name = 'api'
 
@@ -17,6 +17,7 @@ router.register('users', UserViewSet, basename='users')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('metrics', metrics, name='metrics'),
     path('r/<str:short_code>/', redirect_to_recipe, name='redirect_to_recipe'),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
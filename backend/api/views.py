@@ -1,25 +1,39 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (F, OuterRef, Prefetch, Subquery,
+                              prefetch_related_objects)
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from users.models import Subscription
-from recipe.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Subscription, annotate_is_subscribed
+from recipe.feed import get_feed_ids
+from recipe.ingredient_index import get_ingredient_index
+from recipe.pantry_index import get_pantry_index
+from recipe.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                           ShoppingListItem, Tag)
+from recipe.versions import (INGREDIENTS_VERSION, RECIPES_VERSION,
+                             TAGS_VERSION, get_version)
+from .cache import (AnonymousListCacheMixin, VersionETagMixin,
+                    get_not_modified_response, make_etag)
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPageNumberPagination
-from .permissions import IsAuthorOrReadOnly
+from .pagination import (CustomPageNumberPagination, FeedPagination,
+                         RecipePagination)
+from .metrics import observe_export, render_metrics
+from .permissions import IsAuthorOrReadOnly, IsStaffOrMetricsToken
+from .renderers import SHOPPING_LIST_RENDERERS
 from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeReadSerializer, RecipeWriteSerializer,
-                          ShoppingCartSerializer, SubscribeSerializer,
-                          SubscriptionSerializer, TagSerializer,
-                          UserAvatarUpdateSerializer, UserSerializer)
+                          PantrySearchSerializer, RecipeFastReadSerializer,
+                          RecipeWriteSerializer, ShoppingCartSerializer,
+                          SubscribeSerializer, SubscriptionSerializer,
+                          TagSerializer, UserAvatarUpdateSerializer,
+                          UserSerializer, get_recipes_limit)
 
 User = get_user_model()
 
@@ -32,40 +46,200 @@ def redirect_to_recipe(request, short_code):
     return redirect(f'/recipes/{recipe.id}')
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+@api_view(['GET'])
+@permission_classes([IsStaffOrMetricsToken])
+def metrics(request):
+    """
+    Отдает метрики в текстовом формате Prometheus. Доступно
+    администраторам и по токену METRICS_TOKEN.
+    """
+    content_type, content = render_metrics()
+    return HttpResponse(content, content_type=content_type)
+
+
+class TagViewSet(VersionETagMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для отображения тегов."""
+    etag_version = TAGS_VERSION
+    precompressed = True
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(VersionETagMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для отображения ингредиентов."""
+    etag_version = INGREDIENTS_VERSION
+    precompressed = True
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает ингредиенты из индекса в памяти процесса:
+        сначала совпадения по началу названия, затем по подстроке.
+        """
+        if not settings.INGREDIENT_INDEX_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.search_index, request)
+
+    def search_index(self, request):
+        return Response(
+            get_ingredient_index().search(request.query_params.get('name', ''))
+        )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(AnonymousListCacheMixin, viewsets.ModelViewSet):
     """
     Вьюсет для управления рецептами.
     """
-    serializer_class = RecipeReadSerializer
+    list_cache_name = 'recipes'
+    list_cache_version = RECIPES_VERSION
+    serializer_class = RecipeFastReadSerializer
     queryset = Recipe.objects.all().order_by('-id')
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipePagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     permission_classes = [IsAuthorOrReadOnly]
 
+    def get_queryset(self):
+        """
+        Для чтения аннотирует флаги пользователя и подгружает связанные
+        объекты, чтобы число запросов не зависело от размера страницы.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in ('list', 'trending', 'pantry', 'feed'):
+            queryset = queryset.with_user_flags(user).with_related(user)
+        elif self.action == 'retrieve':
+            queryset = queryset.with_user_flags(
+                user
+            ).with_author_subscription(user)
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает рецепт или 304, если ETag клиента актуален.
+        ETag учитывает версию рецептов, время изменения рецепта и флаги
+        текущего пользователя, поэтому автор, теги и ингредиенты
+        загружаются только для полного ответа.
+        """
+        recipe = self.get_object()
+        etag = make_etag(
+            get_version(RECIPES_VERSION),
+            recipe.pk,
+            recipe.updated_at.isoformat(),
+            recipe.is_favorited,
+            recipe.is_in_shopping_cart,
+            recipe.is_subscribed_to_author,
+            request.build_absolute_uri('/'),
+            request.accepted_renderer.format
+        )
+        response = get_not_modified_response(request, etag)
+        if response is not None:
+            return response
+        prefetch_related_objects(
+            [recipe], *Recipe.objects.related_lookups(request.user)
+        )
+        response = Response(self.get_serializer(recipe).data)
+        response['ETag'] = etag
+        return response
+
     def get_serializer_class(self):
         """
         Возвращает сериализатор в зависимости от действия.
         """
         if self.action in ['create', 'partial_update']:
             return RecipeWriteSerializer
-        return RecipeReadSerializer
+        return RecipeFastReadSerializer
+
+    @action(
+        detail=False, methods=['get'],
+        pagination_class=CustomPageNumberPagination
+    )
+    def trending(self, request):
+        """
+        Возвращает популярные рецепты по заранее рассчитанной оценке
+        (команда compute_trending_scores). Поддерживает те же фильтры,
+        что и список рецептов, например tags.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            trending_score__isnull=False
+        ).order_by('-trending_score__score', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False, methods=['get'],
+        pagination_class=CustomPageNumberPagination
+    )
+    def pantry(self, request):
+        """
+        Подбирает рецепты по списку имеющихся ингредиентов
+        (параметр ingredients, можно повторять): сначала те, что можно
+        приготовить полностью, затем с наименьшим числом недостающих.
+        Ранжирование выполняется по индексу в памяти процесса,
+        из БД загружается только текущая страница.
+        """
+        params = PantrySearchSerializer(data={
+            'ingredients': request.query_params.getlist('ingredients')
+        })
+        params.is_valid(raise_exception=True)
+        ranked = get_pantry_index().search(
+            params.validated_data['ingredients']
+        )
+        page = self.paginate_queryset(ranked)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in page]
+        )
+        data = []
+        for missing, recipe_id in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            item = self.get_serializer(recipe).data
+            item['missing_ingredients'] = missing
+            data.append(item)
+        return self.get_paginated_response(data)
+
+    @action(
+        detail=False, methods=['get'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """
+        Возвращает новые рецепты авторов, на которых подписан
+        пользователь, по убыванию id с пагинацией по ключу before.
+        """
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_ids(
+            lambda before, limit: get_feed_ids(request.user, before, limit),
+            request
+        )
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], pagination_class=None)
+    def similar(self, request, pk=None):
+        """
+        Возвращает рецепты, похожие по составу ингредиентов,
+        из таблицы, рассчитанной командой compute_similar_recipes.
+        """
+        recipe = self.get_object()
+        user = request.user
+        queryset = Recipe.objects.filter(
+            similar_for__recipe=recipe
+        ).with_user_flags(user).with_related(user).order_by(
+            '-similar_for__score', '-id'
+        )
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
@@ -162,28 +336,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=False, methods=['get'],
         url_path='download_shopping_cart',
         permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
         """
-        Создает и возвращает текстовый файл со списком покупок
-        для текущего пользователя.
+        Возвращает файл со списком покупок для текущего пользователя.
+        Формат выбирается параметром format (txt, csv, json, pdf),
+        файл передается потоком по мере чтения строк из БД.
         """
-        ingredients = Ingredient.objects.filter(
-            recipeingredient__recipe__shopping_carts__user=request.user
-        ).values('name', 'measurement_unit').annotate(
-            total_amount=Sum('recipeingredient__amount')
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user, total_amount__gt=0
+        ).values(
+            'total_amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        ).order_by('ingredient__name')
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            observe_export(
+                renderer.stream(ingredients.iterator()), renderer.format
+            ),
+            content_type=renderer.content_type
         )
-
-        content = 'Список покупок:\n\n'
-        for item in ingredients:
-            content += (
-                f"{item['name']} ({item['measurement_unit']}): "
-                f"{item['total_amount']}\n"
-            )
-
-        response = HttpResponse(content, content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{renderer.format}"'
         )
 
         return response
@@ -197,6 +374,14 @@ class UserViewSet(UserViewSet):
     pagination_class = LimitOffsetPagination
     queryset = User.objects.all()
 
+    def get_queryset(self):
+        """
+        Аннотирует пользователей флагом is_subscribed.
+        """
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
     @action(
         detail=True,
         methods=['post'],
@@ -283,5 +468,25 @@ class SubscriptionViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """
         Возвращает список подписок текущего пользователя.
+        Первые recipes_limit рецептов каждого автора отбираются в БД,
+        число рецептов хранится в счетчике автора, поэтому страница
+        загружается за несколько запросов.
         """
-        return Subscription.objects.filter(user=self.request.user)
+        user = self.request.user
+        recipes = Recipe.objects.order_by('-id')
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).order_by('-id').values('pk')[:recipes_limit]
+            ))
+        authors = annotate_is_subscribed(User.objects.all(), user)
+        return Subscription.objects.filter(user=user).prefetch_related(
+            Prefetch('subscribed_to', queryset=authors),
+            Prefetch(
+                'subscribed_to__recipes',
+                queryset=recipes,
+                to_attr='limited_recipes'
+            )
+        ).order_by('id')
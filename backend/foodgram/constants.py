@@ -9,3 +9,10 @@ USER_USERNAME_SIZE = 150
 USER_NAME_SIZE = 30
 MIN_VALUE_VALIDATOR = 1
 MAX_VALUE_VALIDATOR = 32000
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_WINDOW_DAYS = 30
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_MAX_INGREDIENT_RECIPES = 500
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 50
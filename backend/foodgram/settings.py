@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from django.core.management.utils import get_random_secret_key
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'django_filters',
@@ -37,6 +39,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +91,25 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300))
+
+# Ответы короче этого размера (в байтах) не сжимаются:
+# заголовки gzip/brotli съедают выигрыш.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -110,12 +133,60 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
 
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=1024))
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv('TOKEN_CACHE_LOCAL_TTL', default=30))
+TOKEN_CACHE_SHARED = os.getenv('TOKEN_CACHE_SHARED', default='True') == 'True'
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=300))
+
+PERFORMANCE_SERVER_TIMING = os.getenv(
+    'PERFORMANCE_SERVER_TIMING', default=str(DEBUG)
+) == 'True'
+PERFORMANCE_LOG_SAMPLE_RATE = float(
+    os.getenv('PERFORMANCE_LOG_SAMPLE_RATE', default=0.01)
+)
+PERFORMANCE_SLOW_REQUEST_MS = int(
+    os.getenv('PERFORMANCE_SLOW_REQUEST_MS', default=500)
+)
+PERFORMANCE_SLOW_REQUEST_QUERIES = int(
+    os.getenv('PERFORMANCE_SLOW_REQUEST_QUERIES', default=30)
+)
+PERFORMANCE_MAX_LOGGED_QUERIES = 100
+
+# Токен, с которым Prometheus читает /api/metrics
+# (Authorization: Bearer <токен>). Пустой — только для администраторов.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+INGREDIENT_INDEX_ENABLED = os.getenv(
+    'INGREDIENT_INDEX_ENABLED', default='True'
+) == 'True'
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.UserSerializer',
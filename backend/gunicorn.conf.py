@@ -0,0 +1,27 @@
+import os
+import shutil
+import tempfile
+
+# Метрики воркеров пишутся в файлы общего каталога и суммируются
+# при сборе (/api/metrics). prometheus_client выбирает способ хранения
+# значений при первом импорте, поэтому переменная задается здесь,
+# в процессе мастера, до любого импорта prometheus_client: воркеры
+# наследуют уже импортированный модуль.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram_metrics')
+)
+
+
+def on_starting(server):
+    """Удаляет файлы метрик, оставшиеся от предыдущего запуска."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    """Убирает gauge-метрики завершившегося воркера."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
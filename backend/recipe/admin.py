@@ -1,7 +1,10 @@
+from collections import defaultdict
+
 from django.contrib import admin
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     RecipeTrendingScore, ShoppingCart, ShoppingListItem,
+                     Tag)
 
 
 class IngredientInline(admin.TabularInline):
@@ -10,8 +13,8 @@ class IngredientInline(admin.TabularInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorite_count')
-    readonly_fields = ('favorite_count',)
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
+    readonly_fields = ('favorites_count', 'in_carts_count')
     search_fields = ('name', 'author__username',)
     list_filter = ('tags',)
     filter_horizontal = ('tags', 'ingredients',)
@@ -21,9 +24,28 @@ class RecipeAdmin(admin.ModelAdmin):
         IngredientInline,
     ]
 
-    def favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
-    favorite_count.short_description = 'Число добавлений в избранное'
+    def save_related(self, request, form, formsets, change):
+        """
+        Применяет изменения ингредиентов к спискам покупок пользователей,
+        у которых рецепт в корзине, и помечает рецепт для пересчета
+        похожих.
+        """
+        recipe_id = form.instance.pk
+        before = (
+            ShoppingListItem.objects.recipe_amounts(recipe_id)
+            if change else {}
+        )
+        super().save_related(request, form, formsets, change)
+        after = ShoppingListItem.objects.recipe_amounts(recipe_id)
+        ShoppingListItem.objects.apply_recipe_changes(recipe_id, {
+            ingredient_id: (
+                after.get(ingredient_id, 0) - before.get(ingredient_id, 0)
+            )
+            for ingredient_id in before.keys() | after.keys()
+        })
+        Recipe.objects.filter(pk=recipe_id).update(
+            similar_recipes_stale=True
+        )
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -36,8 +58,48 @@ class TagAdmin(admin.ModelAdmin):
 
 
 class RecipeIngredientAdmin(admin.ModelAdmin):
+    """
+    Ингредиенты рецептов. Изменения сразу применяются к спискам покупок
+    пользователей, у которых рецепт в корзине.
+    """
     list_display = ('recipe', 'ingredient', 'amount')
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            old = RecipeIngredient.objects.get(pk=obj.pk)
+            self.apply_changes([old], sign=-1)
+        super().save_model(request, obj, form, change)
+        self.apply_changes([obj])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.apply_changes([obj], sign=-1)
+
+    def delete_queryset(self, request, queryset):
+        deleted = list(queryset)
+        super().delete_queryset(request, queryset)
+        self.apply_changes(deleted, sign=-1)
+
+    @staticmethod
+    def apply_changes(recipe_ingredients, sign=1):
+        """
+        Добавляет количество ингредиентов в списки покупок (или вычитает
+        при sign=-1) и помечает рецепты для пересчета похожих.
+        """
+        deltas = defaultdict(dict)
+        for item in recipe_ingredients:
+            recipe_deltas = deltas[item.recipe_id]
+            recipe_deltas[item.ingredient_id] = (
+                recipe_deltas.get(item.ingredient_id, 0) + sign * item.amount
+            )
+        for recipe_id, recipe_deltas in deltas.items():
+            ShoppingListItem.objects.apply_recipe_changes(
+                recipe_id, recipe_deltas
+            )
+        Recipe.objects.filter(pk__in=deltas).update(
+            similar_recipes_stale=True
+        )
+
 
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe',)
@@ -47,9 +109,21 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'user',)
 
 
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    list_select_related = ('user', 'ingredient')
+
+
+class RecipeTrendingScoreAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'score', 'updated_at')
+    list_select_related = ('recipe',)
+
+
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
+admin.site.register(RecipeTrendingScore, RecipeTrendingScoreAdmin)
@@ -0,0 +1,461 @@
+import csv
+import io
+import random
+import string
+from collections import defaultdict
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from foodgram.constants import (FEED_BACKFILL_SIZE, FEED_FANOUT_MAX_FOLLOWERS,
+                                RECIPE_SHORT_CODE_SIZE)
+from users.models import Subscription
+from .importers import (batched, get_ingredient_importer, get_tag_importer,
+                        read_csv)
+from .models import (Favorite, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredient, ShoppingCart, ShoppingListItem, Tag)
+from .versions import PANTRY_VERSION, RECIPES_VERSION, bump_version
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+DEFAULT_PASSWORD = 'foodgram-password'
+INGREDIENTS_PATH = './data/ingredients.csv'
+TAGS_PATH = './data/tags.csv'
+PLACEHOLDER_IMAGES = 16
+PLACEHOLDER_IMAGE_PATH = 'recipe/images/placeholder_{number}.png'
+SHORT_CODE_ALPHABET = string.ascii_letters + string.digits
+# Показатели степенных распределений: чем больше, тем сильнее
+# популярность сосредоточена у первых по рангу объектов.
+AUTHORS_EXPONENT = 1.1
+FOLLOWEES_EXPONENT = 1.0
+RECIPES_EXPONENT = 1.0
+INGREDIENTS_EXPONENT = 1.0
+TAGS_EXPONENT = 1.0
+DISHES = (
+    'Салат', 'Суп', 'Рагу', 'Запеканка', 'Пирог', 'Омлет', 'Паста',
+    'Каша', 'Плов', 'Жаркое', 'Десерт', 'Котлеты', 'Соус', 'Смузи',
+)
+FIRST_NAMES = (
+    'Анна', 'Иван', 'Мария', 'Дмитрий', 'Елена', 'Алексей', 'Ольга',
+    'Сергей', 'Наталья', 'Андрей', 'Татьяна', 'Михаил',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков',
+)
+
+
+def zipf_cum_weights(size, exponent):
+    """Накопленные веса распределения Ципфа для random.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def heavy_tailed(rng, mean, limit, alpha=1.5):
+    """
+    Случайное число с распределением Парето (тяжелый хвост)
+    и средним около mean, не больше limit.
+    """
+    if mean <= 0 or limit <= 0:
+        return 0
+    return min(round(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha),
+               limit)
+
+
+def sample_distinct(rng, population, cum_weights, count, attempts=3):
+    """
+    Выбирает до count разных элементов с весами. У популярных
+    элементов повторы часты, поэтому недобор добирается несколько раз.
+    """
+    chosen = set()
+    for _ in range(attempts):
+        missing = count - len(chosen)
+        if missing <= 0:
+            break
+        chosen.update(
+            rng.choices(population, cum_weights=cum_weights, k=missing)
+        )
+    return sorted(chosen)
+
+
+def bulk_create_with_ids(model, objects):
+    """
+    Создает объекты одним bulk_create и возвращает их id в порядке
+    objects. PostgreSQL возвращает id сам, для остальных БД они
+    читаются по возрастанию после наибольшего id до вставки, поэтому
+    параллельно в таблицу никто писать не должен.
+    """
+    last_id = model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+    model.objects.bulk_create(objects)
+    if objects and objects[0].pk is not None:
+        return [obj.pk for obj in objects]
+    ids = list(model.objects.filter(pk__gt=last_id).order_by(
+        'pk'
+    ).values_list('pk', flat=True)[:len(objects)])
+    if len(ids) != len(objects):
+        raise RuntimeError(
+            f'{model._meta.label}: во время генерации в таблицу '
+            f'писал другой процесс'
+        )
+    return ids
+
+
+def insert_rows(model, fields, rows, batch_size=BATCH_SIZE):
+    """
+    Вставляет строки rows (кортежи значений fields) пачками без
+    создания объектов моделей: на PostgreSQL через COPY, в остальных
+    БД через executemany. Поля created_at и updated_at, если они есть
+    у модели, заполняются текущим временем. Каждая пачка пишется
+    в своей транзакции: в режиме autocommit executemany на SQLite
+    фиксировал бы каждую строку отдельно. Возвращает число строк.
+    """
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(field).column for field in fields]
+    extra = ()
+    if any(field.name == 'created_at' for field in model._meta.fields):
+        columns += ['created_at', 'updated_at']
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        extra = (now, now)
+    table = quote(model._meta.db_table)
+    column_list = ', '.join(quote(column) for column in columns)
+    count = 0
+    with connection.cursor() as cursor:
+        for batch in batched(rows, batch_size):
+            batch = [tuple(row) + extra for row in batch]
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    cursor.copy_expert(
+                        f'COPY {table} ({column_list}) '
+                        f'FROM STDIN WITH (FORMAT csv)',
+                        buffer
+                    )
+                else:
+                    cursor.executemany(
+                        f'INSERT INTO {table} ({column_list}) '
+                        f'VALUES ({", ".join(["%s"] * len(columns))})',
+                        batch
+                    )
+            count += len(batch)
+    return count
+
+
+class DatasetGenerator:
+    """
+    Генератор синтетических данных для нагрузочного тестирования:
+    пользователи, рецепты со степенным распределением авторов,
+    ингредиентов и тегов, избранное, корзины и граф подписок.
+
+    Сначала в памяти строится план связей, по которому сразу
+    считаются денормализованные счетчики, затем строки пишутся
+    пачками по batch_size: пользователи и рецепты через bulk_create,
+    многочисленные строки связующих таблиц — insert_rows без создания
+    объектов моделей. Сигналы при этом не вызываются,
+    поэтому ленты подписок и списки покупок заполняются здесь же,
+    а версии рецептов и индекса продуктов меняются в конце.
+    При одном и том же seed данные совпадают.
+    """
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, images=False,
+                 log=None):
+        self.rng = random.Random(seed)
+        self.prefix = f'gen{seed}_'
+        self.batch_size = batch_size
+        self.images = images
+        self.log = log or (lambda message: None)
+
+    def generate(self, users, recipes, favorites=20, carts=3,
+                 subscriptions=10):
+        """
+        Создает users пользователей и recipes рецептов. favorites,
+        carts и subscriptions — среднее число избранных рецептов,
+        рецептов в корзине и подписок на пользователя.
+        """
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise ValueError(
+                f'Данные с префиксом {self.prefix} уже созданы, '
+                f'выберите другой seed.'
+            )
+        ingredients, tags = self.load_reference_data()
+        self.plan(users, recipes, favorites, carts, subscriptions)
+        if self.images:
+            self.create_placeholder_images()
+        user_ids = self.create_users(users)
+        recipe_ids = self.create_recipes(user_ids, ingredients, tags)
+        self.create_relations(user_ids, recipe_ids)
+        self.create_feeds(user_ids)
+        self.create_shopping_lists(user_ids)
+        bump_version(RECIPES_VERSION)
+        bump_version(PANTRY_VERSION)
+        return {
+            'users': users,
+            'recipes': recipes,
+            'subscriptions': len(self.subscriptions),
+            'favorites': len(self.favorites),
+            'carts': len(self.carts),
+        }
+
+    def load_reference_data(self):
+        """
+        Загружает ингредиенты и теги из data/, если справочников нет,
+        и возвращает их id.
+        """
+        for model, importer, path in (
+            (Ingredient, get_ingredient_importer(), INGREDIENTS_PATH),
+            (Tag, get_tag_importer(), TAGS_PATH),
+        ):
+            if not model.objects.exists():
+                importer.run(read_csv(path, importer.fields))
+        ingredients = list(Ingredient.objects.order_by('pk').values_list(
+            'pk', 'name'
+        ))
+        tags = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+        return ingredients, tags
+
+    def plan(self, users, recipes, favorites, carts, subscriptions):
+        """
+        Разыгрывает авторов рецептов, подписки, избранное и корзины
+        по номерам пользователей и рецептов и считает счетчики.
+        """
+        rng = self.rng
+        user_ranks = list(range(users))
+        rng.shuffle(user_ranks)
+        self.authors = rng.choices(
+            user_ranks,
+            cum_weights=zipf_cum_weights(users, AUTHORS_EXPONENT),
+            k=recipes
+        )
+
+        followee_weights = zipf_cum_weights(users, FOLLOWEES_EXPONENT)
+        self.subscriptions = []
+        for user in range(users):
+            count = heavy_tailed(rng, subscriptions, users - 1)
+            self.subscriptions.extend(
+                (user, author) for author in sample_distinct(
+                    rng, user_ranks, followee_weights, count
+                ) if author != user
+            )
+
+        recipe_ranks = list(range(recipes))
+        rng.shuffle(recipe_ranks)
+        recipe_weights = zipf_cum_weights(recipes, RECIPES_EXPONENT)
+        self.favorites = []
+        self.carts = []
+        for user in range(users):
+            for relations, mean in (
+                (self.favorites, favorites), (self.carts, carts)
+            ):
+                count = heavy_tailed(rng, mean, recipes)
+                relations.extend(
+                    (user, recipe) for recipe in sample_distinct(
+                        rng, recipe_ranks, recipe_weights, count
+                    )
+                )
+
+        self.followers_count = [0] * users
+        for _, author in self.subscriptions:
+            self.followers_count[author] += 1
+        self.recipes_count = [0] * users
+        for author in self.authors:
+            self.recipes_count[author] += 1
+        self.favorites_count = [0] * recipes
+        for _, recipe in self.favorites:
+            self.favorites_count[recipe] += 1
+        self.in_carts_count = [0] * recipes
+        for _, recipe in self.carts:
+            self.in_carts_count[recipe] += 1
+        self.carted = {recipe for _, recipe in self.carts}
+
+    def create_placeholder_images(self):
+        """
+        Создает PLACEHOLDER_IMAGES картинок-заглушек. Рецепты
+        ссылаются на них по очереди, отдельные файлы не создаются.
+        """
+        for number in range(PLACEHOLDER_IMAGES):
+            path = PLACEHOLDER_IMAGE_PATH.format(number=number)
+            if default_storage.exists(path):
+                continue
+            # Отдельный генератор: данные не зависят от того,
+            # были ли картинки созданы при прошлом запуске.
+            rng = random.Random(number)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+            default_storage.save(path, ContentFile(buffer.getvalue()))
+
+    def batches(self, size):
+        for start in range(0, size, self.batch_size):
+            yield range(start, min(start + self.batch_size, size))
+
+    def create_users(self, users):
+        password = make_password(DEFAULT_PASSWORD)
+        user_ids = []
+        for batch in self.batches(users):
+            user_ids.extend(bulk_create_with_ids(User, [
+                User(
+                    email=f'{self.prefix}{number}@example.com',
+                    username=f'{self.prefix}{number}',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                    followers_count=self.followers_count[number],
+                    recipes_count=self.recipes_count[number],
+                )
+                for number in batch
+            ]))
+            self.log(f'Пользователей: {len(user_ids)}')
+        return user_ids
+
+    def create_recipes(self, user_ids, ingredients, tags):
+        """
+        Создает рецепты пачками вместе с их ингредиентами и тегами.
+        Составы рецептов, попавших в корзины, запоминаются для
+        списков покупок.
+        """
+        rng = self.rng
+        ingredient_weights = zipf_cum_weights(
+            len(ingredients), INGREDIENTS_EXPONENT
+        )
+        ingredients = list(ingredients)
+        rng.shuffle(ingredients)
+        tag_weights = zipf_cum_weights(len(tags), TAGS_EXPONENT)
+        TagRelation = Recipe.tags.through
+        self.compositions = {}
+        recipe_ids = []
+        for batch in self.batches(len(self.authors)):
+            recipes = []
+            compositions = []
+            for number in batch:
+                composition = sample_distinct(
+                    rng, range(len(ingredients)), ingredient_weights,
+                    round(rng.triangular(3, 15, 6))
+                )
+                compositions.append([
+                    (ingredients[position][0], rng.randint(1, 500))
+                    for position in composition
+                ])
+                names = [ingredients[position][1] for position in composition]
+                author = self.authors[number]
+                recipes.append(Recipe(
+                    name=f'{rng.choice(DISHES)}: {", ".join(names[:2])}',
+                    author_id=user_ids[author],
+                    image=PLACEHOLDER_IMAGE_PATH.format(
+                        number=number % PLACEHOLDER_IMAGES
+                    ),
+                    text=f'Возьмите {", ".join(names)}. Перемешайте '
+                         f'и готовьте до готовности.',
+                    cooking_time=rng.randint(5, 180),
+                    short_code=''.join(rng.choices(
+                        SHORT_CODE_ALPHABET, k=RECIPE_SHORT_CODE_SIZE
+                    )),
+                    favorites_count=self.favorites_count[number],
+                    in_carts_count=self.in_carts_count[number],
+                    fanned_out=(
+                        self.followers_count[author]
+                        <= FEED_FANOUT_MAX_FOLLOWERS
+                    ),
+                ))
+            with transaction.atomic():
+                ids = bulk_create_with_ids(Recipe, recipes)
+                insert_rows(
+                    RecipeIngredient, ('recipe', 'ingredient', 'amount'),
+                    (
+                        (recipe_id, ingredient_id, amount)
+                        for recipe_id, composition in zip(ids, compositions)
+                        for ingredient_id, amount in composition
+                    ),
+                    self.batch_size
+                )
+                insert_rows(
+                    TagRelation, ('recipe', 'tag'),
+                    (
+                        (recipe_id, tag_id)
+                        for recipe_id in ids
+                        for tag_id in sample_distinct(
+                            rng, tags, tag_weights, rng.randint(1, 3)
+                        )
+                    ),
+                    self.batch_size
+                )
+            for number, composition in zip(batch, compositions):
+                if number in self.carted:
+                    self.compositions[number] = composition
+            recipe_ids.extend(ids)
+            self.log(f'Рецептов: {len(recipe_ids)}')
+        return recipe_ids
+
+    def create_relations(self, user_ids, recipe_ids):
+        """Создает подписки, избранное и корзины пачками."""
+        for model, fields, pairs, targets in (
+            (Subscription, ('user', 'subscribed_to'), self.subscriptions,
+             user_ids),
+            (Favorite, ('user', 'recipe'), self.favorites, recipe_ids),
+            (ShoppingCart, ('user', 'recipe'), self.carts, recipe_ids),
+        ):
+            insert_rows(
+                model, fields,
+                (
+                    (user_ids[user], targets[target])
+                    for user, target in pairs
+                ),
+                self.batch_size
+            )
+            self.log(f'{model._meta.verbose_name_plural}: {len(pairs)}')
+
+    def create_feeds(self, user_ids):
+        """
+        Заполняет ленты подписчиков последними FEED_BACKFILL_SIZE
+        рецептами авторов с разосланными рецептами, как при подписке
+        (add_author_to_feed). Записей лент на порядки больше, чем
+        рецептов, поэтому они вставляются одним INSERT ... SELECT
+        на стороне БД.
+        """
+        quote = connection.ops.quote_name
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        first_user_id = min(user_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(FeedEntry._meta.db_table)} '
+                f'(user_id, recipe_id, created_at, updated_at) '
+                f'SELECT subscription.user_id, recipe.id, %s, %s '
+                f'FROM {quote(Subscription._meta.db_table)} subscription '
+                f'JOIN {quote(User._meta.db_table)} author '
+                f'ON author.id = subscription.subscribed_to_id '
+                f'JOIN (SELECT id, author_id, ROW_NUMBER() OVER ('
+                f'PARTITION BY author_id ORDER BY id DESC) AS position '
+                f'FROM {quote(Recipe._meta.db_table)} '
+                f'WHERE author_id >= %s) recipe '
+                f'ON recipe.author_id = subscription.subscribed_to_id '
+                f'WHERE subscription.user_id >= %s '
+                f'AND author.followers_count <= %s '
+                f'AND recipe.position <= %s',
+                (now, now, first_user_id, first_user_id,
+                 FEED_FANOUT_MAX_FOLLOWERS, FEED_BACKFILL_SIZE)
+            )
+            self.log(f'Записей лент: {cursor.rowcount}')
+
+    def create_shopping_lists(self, user_ids):
+        """Складывает составы рецептов из корзин в списки покупок."""
+        totals = defaultdict(int)
+        for user, recipe in self.carts:
+            for ingredient_id, amount in self.compositions[recipe]:
+                totals[user_ids[user], ingredient_id] += amount
+        insert_rows(
+            ShoppingListItem, ('user', 'ingredient', 'total_amount'),
+            (
+                (user_id, ingredient_id, total_amount)
+                for (user_id, ingredient_id), total_amount in totals.items()
+            ),
+            self.batch_size
+        )
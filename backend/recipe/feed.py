@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+
+from foodgram.constants import (FEED_BACKFILL_SIZE, FEED_BATCH_SIZE,
+                                FEED_FANOUT_MAX_FOLLOWERS)
+from users.models import Subscription
+from .models import FeedEntry, Recipe
+
+User = get_user_model()
+
+
+def fan_out_recipe(recipe_id, author_id):
+    """
+    Добавляет рецепт в ленты подписчиков автора пачками по
+    FEED_BATCH_SIZE и помечает рецепт как разосланный.
+    Рецепты авторов с числом подписчиков больше
+    FEED_FANOUT_MAX_FOLLOWERS не рассылаются: они попадают в ленту
+    при чтении (см. get_feed_ids).
+    """
+    if User.objects.filter(
+        pk=author_id, followers_count__gt=FEED_FANOUT_MAX_FOLLOWERS
+    ).exists():
+        return
+    follower_ids = Subscription.objects.filter(
+        subscribed_to_id=author_id
+    ).values_list('user_id', flat=True).order_by()
+    batch = []
+    for user_id in follower_ids.iterator(chunk_size=FEED_BATCH_SIZE):
+        batch.append(FeedEntry(user_id=user_id, recipe_id=recipe_id))
+        if len(batch) == FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    Recipe.objects.filter(pk=recipe_id).update(fanned_out=True)
+
+
+def fan_out_pending_recipes():
+    """
+    Рассылает в ленты подписчиков новые рецепты по возрастанию id.
+    Рассылка выполняется командой fan_out_feeds по расписанию, а не
+    в запросе создания рецепта: до нее рецепт попадает в ленты при
+    чтении (см. get_feed_ids). Возвращает число разосланных рецептов.
+    """
+    pending = Recipe.objects.filter(
+        fanned_out=False,
+        author__followers_count__lte=FEED_FANOUT_MAX_FOLLOWERS
+    ).order_by('id').values_list('id', 'author_id')
+    count = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:FEED_BATCH_SIZE])
+        if not batch:
+            return count
+        for recipe_id, author_id in batch:
+            fan_out_recipe(recipe_id, author_id)
+        count += len(batch)
+        last_id = batch[-1][0]
+
+
+def add_author_to_feed(user_id, author_id):
+    """
+    Добавляет в ленту нового подписчика последние разосланные
+    рецепты автора.
+    """
+    recipe_ids = Recipe.objects.filter(
+        author_id=author_id, fanned_out=True
+    ).order_by('-id').values_list('id', flat=True)[:FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in recipe_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Удаляет рецепты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def get_feed_ids(user, before=None, limit=None):
+    """
+    Возвращает id рецептов ленты по убыванию, меньшие before.
+    Разосланные рецепты читаются из таблицы ленты, неразосланные
+    (авторы с большим числом подписчиков или рассылка еще не
+    завершена) — из рецептов подписок по частичному индексу.
+    Обе выборки — диапазонные чтения по индексу не длиннее limit.
+    """
+    entries = FeedEntry.objects.filter(user=user).order_by('-recipe_id')
+    pulled = Recipe.objects.filter(
+        fanned_out=False,
+        author__in=Subscription.objects.filter(
+            user=user
+        ).values('subscribed_to')
+    ).order_by('-id')
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        pulled = pulled.filter(id__lt=before)
+    recipe_ids = set(entries.values_list('recipe_id', flat=True)[:limit])
+    recipe_ids.update(pulled.values_list('id', flat=True)[:limit])
+    return sorted(recipe_ids, reverse=True)[:limit]
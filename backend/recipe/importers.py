@@ -0,0 +1,269 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Ingredient, Tag
+from .versions import (INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION,
+                       bump_version)
+
+BATCH_SIZE = 1000
+JSON_READ_SIZE = 64 * 1024
+STAGING_TABLE = 'import_staging'
+
+
+def batched(rows, size):
+    """Разбивает поток строк на списки не длиннее size."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_csv(path, fields):
+    """Читает CSV без заголовка: столбцы идут в порядке fields."""
+    with open(path, encoding='utf-8', newline='') as file:
+        for line, row in enumerate(csv.reader(file), start=1):
+            if not row:
+                continue
+            if len(row) < len(fields):
+                raise ValueError(
+                    f'{path}, строка {line}: ожидается столбцов '
+                    f'{len(fields)}, получено {len(row)}'
+                )
+            yield {
+                field: value.strip() for field, value in zip(fields, row)
+            }
+
+
+def read_json(path, fields):
+    """
+    Читает JSON-массив объектов потоково: объекты разбираются по мере
+    чтения файла, и весь файл в память не загружается.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as file:
+        buffer = ''
+        while True:
+            chunk = file.read(JSON_READ_SIZE)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in (
+                    ' \t\r\n[],'
+                ):
+                    position += 1
+                if position == len(buffer):
+                    break
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    # Объект прочитан не полностью: ждем следующую часть.
+                    break
+                try:
+                    yield {field: str(item[field]).strip() for field in fields}
+                except (KeyError, TypeError):
+                    raise ValueError(
+                        f'{path}: у объекта {item!r} нет полей {fields}'
+                    )
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+class BulkUpsert:
+    """
+    Загрузка справочника пачками по batch_size строк. Строки содержат
+    поля fields (в порядке столбцов файла); записи сопоставляются
+    по уникальному ключу key_fields: новые создаются, у существующих
+    обновляются остальные поля, если они изменились.
+    Повторная загрузка того же файла ничего не меняет.
+
+    Массовые запросы не вызывают сигналы моделей, поэтому после
+    изменений меняются версии versions, от которых зависят кэши
+    и индексы в памяти процессов.
+    """
+
+    def __init__(self, model, fields, key_fields, versions=(),
+                 batch_size=BATCH_SIZE):
+        self.model = model
+        self.fields = tuple(fields)
+        self.key_fields = tuple(key_fields)
+        self.update_fields = tuple(
+            field for field in self.fields if field not in self.key_fields
+        )
+        self.versions = versions
+        self.batch_size = batch_size
+
+    def get_key(self, values):
+        return tuple(values[field] for field in self.key_fields)
+
+    def run(self, rows):
+        """
+        Загружает строки и возвращает число обработанных, созданных
+        и обновленных записей и время загрузки в секундах.
+        """
+        started = time.perf_counter()
+        if connection.vendor == 'postgresql':
+            result = self.upsert_postgresql(rows)
+        else:
+            result = self.upsert(rows)
+        result['elapsed'] = time.perf_counter() - started
+        if result['created'] or result['updated']:
+            for version in self.versions:
+                bump_version(version)
+        return result
+
+    def upsert(self, rows):
+        """
+        Общий вариант для любой БД: на каждую пачку один запрос
+        существующих записей, bulk_create для новых и bulk_update
+        для измененных.
+        """
+        result = {'total': 0, 'created': 0, 'updated': 0}
+        first_key = self.key_fields[0]
+        for batch in batched(rows, self.batch_size):
+            result['total'] += len(batch)
+            # При повторах ключа в пачке побеждает последняя строка.
+            values = {self.get_key(row): row for row in batch}
+            with transaction.atomic():
+                existing = {
+                    tuple(
+                        getattr(obj, field) for field in self.key_fields
+                    ): obj
+                    for obj in self.model.objects.filter(**{
+                        f'{first_key}__in': {key[0] for key in values}
+                    })
+                }
+                created = [
+                    self.model(**row) for key, row in values.items()
+                    if key not in existing
+                ]
+                changed = []
+                now = timezone.now()
+                for key, obj in existing.items():
+                    row = values.get(key)
+                    if row is None or all(
+                        getattr(obj, field) == row[field]
+                        for field in self.update_fields
+                    ):
+                        continue
+                    for field in self.update_fields:
+                        setattr(obj, field, row[field])
+                    obj.updated_at = now
+                    changed.append(obj)
+                self.model.objects.bulk_create(created, ignore_conflicts=True)
+                self.model.objects.bulk_update(
+                    changed, (*self.update_fields, 'updated_at')
+                )
+            result['created'] += len(created)
+            result['updated'] += len(changed)
+        return result
+
+    def upsert_postgresql(self, rows):
+        """
+        Строки передаются через COPY во временную таблицу, откуда
+        переносятся одним INSERT ... ON CONFLICT. Обновляются только
+        записи, в которых что-то изменилось.
+        """
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+
+        def get_columns(fields):
+            return [
+                quote(self.model._meta.get_field(field).column)
+                for field in fields
+            ]
+
+        columns = get_columns(self.fields)
+        keys = ', '.join(get_columns(self.key_fields))
+        updates = get_columns(self.update_fields)
+        column_list = ', '.join(columns)
+        if updates:
+            conflict = 'DO UPDATE SET {}, updated_at = now() WHERE {}'.format(
+                ', '.join(f'{column} = EXCLUDED.{column}'
+                          for column in updates),
+                ' OR '.join(f'{table}.{column} IS DISTINCT FROM '
+                            f'EXCLUDED.{column}' for column in updates)
+            )
+        else:
+            conflict = 'DO NOTHING'
+
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+                f'(line bigserial, '
+                f'{", ".join(f"{column} text" for column in columns)}) '
+                f'ON COMMIT DROP'
+            )
+            for batch in batched(rows, self.batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    [row[field] for field in self.fields] for row in batch
+                )
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {STAGING_TABLE} ({column_list}) '
+                    f'FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+                total += len(batch)
+            # DISTINCT ON оставляет последнюю строку для каждого ключа:
+            # ON CONFLICT не может изменить одну запись дважды.
+            cursor.execute(
+                f'INSERT INTO {table} ({column_list}, created_at, updated_at) '
+                f'SELECT DISTINCT ON ({keys}) {column_list}, now(), now() '
+                f'FROM {STAGING_TABLE} ORDER BY {keys}, line DESC '
+                f'ON CONFLICT ({keys}) {conflict} '
+                f'RETURNING xmax = 0'
+            )
+            inserted = [row[0] for row in cursor.fetchall()]
+        return {
+            'total': total,
+            'created': sum(inserted),
+            'updated': len(inserted) - sum(inserted),
+        }
+
+
+def get_ingredient_importer(batch_size=BATCH_SIZE):
+    """
+    Ингредиенты уникальны по паре (название, единица измерения),
+    поэтому загрузка только добавляет новые. Рецептов новые
+    ингредиенты не касаются.
+    """
+    return BulkUpsert(
+        Ingredient,
+        fields=('name', 'measurement_unit'),
+        key_fields=('name', 'measurement_unit'),
+        versions=(INGREDIENTS_VERSION,),
+        batch_size=batch_size
+    )
+
+
+def get_tag_importer(batch_size=BATCH_SIZE):
+    """
+    Теги сопоставляются по слагу, название обновляется. Название
+    тега есть в ответах рецептов, поэтому меняется и их версия.
+    """
+    return BulkUpsert(
+        Tag,
+        fields=('name', 'slug'),
+        key_fields=('slug',),
+        versions=(TAGS_VERSION, RECIPES_VERSION),
+        batch_size=batch_size
+    )
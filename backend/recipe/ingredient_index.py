@@ -0,0 +1,77 @@
+import threading
+from bisect import bisect_left
+
+from .models import Ingredient
+from .versions import INGREDIENTS_VERSION, get_version
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def fold(value):
+    """
+    Приводит строку к виду для сравнения без учета регистра.
+    Буква «ё» приравнивается к «е».
+    """
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Хранит отсортированные нормализованные названия; совпадения
+    по началу названия ищутся бинарным поиском и идут первыми,
+    за ними следуют совпадения по подстроке.
+    """
+
+    def __init__(self, ingredients, version=None):
+        self.version = version
+        self.items = sorted(ingredients, key=lambda item: item['id'])
+        by_name = sorted(
+            ((fold(item['name']), item) for item in self.items),
+            key=lambda pair: (pair[0], pair[1]['id'])
+        )
+        self.keys = [key for key, _ in by_name]
+        self.sorted_items = [item for _, item in by_name]
+
+    @classmethod
+    def build(cls, version=None):
+        """Строит индекс по всем ингредиентам из БД."""
+        return cls(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            version=version
+        )
+
+    def search(self, query):
+        """
+        Возвращает ингредиенты, название которых начинается с query,
+        а затем ингредиенты, содержащие query внутри названия.
+        """
+        query = fold(query)
+        if not query:
+            return self.items
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\U0010ffff')
+        prefix_matches = self.sorted_items[start:end]
+        substring_matches = [
+            self.sorted_items[position]
+            for position, key in enumerate(self.keys)
+            if query in key and not start <= position < end
+        ]
+        return prefix_matches + substring_matches
+
+
+def get_ingredient_index():
+    """
+    Возвращает индекс ингредиентов текущего процесса,
+    перестраивая его при смене версии данных.
+    """
+    global _index
+    version = get_version(INGREDIENTS_VERSION)
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            index = _index
+            if index is None or index.version != version:
+                index = _index = IngredientIndex.build(version)
+    return index
@@ -0,0 +1,56 @@
+import os
+from abc import ABC, abstractmethod
+
+from django.core.management import BaseCommand, CommandError
+
+from recipe.importers import BATCH_SIZE, READERS
+
+
+class ImportCommand(ABC, BaseCommand):
+    """
+    Базовая команда загрузки справочника из CSV или JSON файла.
+    Формат определяется по расширению файла.
+    """
+    default_path = None
+
+    @abstractmethod
+    def get_importer(self, batch_size):
+        """Возвращает BulkUpsert для справочника команды."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=self.default_path,
+            help=f'Файл .csv или .json (по умолчанию {self.default_path}).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Число строк в одной пачке.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError(
+                f'Неизвестный формат файла {path}, '
+                f'поддерживаются: {", ".join(READERS)}'
+            )
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл {path} не найден')
+
+        importer = self.get_importer(options['batch_size'])
+        try:
+            result = importer.run(reader(path, importer.fields))
+        except ValueError as error:
+            raise CommandError(error)
+
+        rate = result['total'] / result['elapsed'] if result['elapsed'] else 0
+        self.stdout.write(
+            f'Обработано строк: {result["total"]} за '
+            f'{result["elapsed"]:.2f} с ({rate:.0f} строк/с), '
+            f'создано {result["created"]}, обновлено {result["updated"]}.'
+        )
@@ -0,0 +1,61 @@
+import random
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from recipe.ingredient_index import IngredientIndex
+from recipe.models import Ingredient
+
+
+class Command(BaseCommand):
+    """
+    Команда для сравнения поиска ингредиентов по индексу в памяти
+    и через ORM (name__istartswith).
+    """
+    help = "Сравнивает скорость автодополнения ингредиентов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', type=int, default=500,
+            help='Число поисковых запросов.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.'
+        )
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('В базе нет ингредиентов.')
+
+        rng = random.Random(options['seed'])
+        queries = []
+        for _ in range(options['queries']):
+            name = rng.choice(names)
+            queries.append(name[:rng.randint(1, min(4, len(name)))])
+
+        started = time.perf_counter()
+        index = IngredientIndex.build()
+        build_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query)
+        index_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for query in queries:
+            list(Ingredient.objects.filter(
+                name__istartswith=query
+            ).values('id', 'name', 'measurement_unit'))
+        orm_time = time.perf_counter() - started
+
+        count = len(queries)
+        self.stdout.write(
+            f'Ингредиентов: {len(names)}, запросов: {count}\n'
+            f'Построение индекса: {build_time * 1000:.1f} мс\n'
+            f'Индекс: {index_time / count * 1e6:.1f} мкс на запрос\n'
+            f'ORM: {orm_time / count * 1e6:.1f} мкс на запрос\n'
+            f'Ускорение: {orm_time / index_time:.1f}x'
+        )
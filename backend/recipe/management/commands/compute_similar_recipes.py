@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+
+from recipe.similarity import compute_similar_recipes
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета похожих рецептов по составу ингредиентов.
+    Запускается по расписанию, без флага --full обрабатывает
+    только рецепты с измененным составом.
+    """
+    help = "Пересчитывает таблицу похожих рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать похожие рецепты для всех рецептов.'
+        )
+
+    def handle(self, *args, **options):
+        count = compute_similar_recipes(full=options['full'])
+        self.stdout.write(f'Пересчитано рецептов: {count}')
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipe.models import RecipeTrendingScore
+from recipe.trending import compute_trending_scores
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета популярности рецептов.
+    Запускается по расписанию (например, cron раз в несколько минут).
+    """
+    help = "Пересчитывает таблицу популярных рецептов"
+
+    def handle(self, *args, **options):
+        scores = compute_trending_scores()
+        with transaction.atomic():
+            RecipeTrendingScore.objects.all().delete()
+            RecipeTrendingScore.objects.bulk_create(
+                (
+                    RecipeTrendingScore(recipe_id=recipe_id, score=score)
+                    for recipe_id, score in scores.items()
+                ),
+                batch_size=BATCH_SIZE
+            )
+        self.stdout.write(f'Рассчитана популярность рецептов: {len(scores)}')
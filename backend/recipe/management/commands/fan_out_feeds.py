@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from recipe.feed import fan_out_pending_recipes
+
+
+class Command(BaseCommand):
+    """
+    Команда для рассылки новых рецептов в ленты подписчиков.
+    Запускается по расписанию (например, cron раз в минуту).
+    """
+    help = "Рассылает новые рецепты в ленты подписчиков"
+
+    def handle(self, *args, **options):
+        count = fan_out_pending_recipes()
+        self.stdout.write(f'Разослано рецептов: {count}')
@@ -0,0 +1,79 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from recipe.dataset import BATCH_SIZE, DEFAULT_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    """
+    Команда для заполнения базы синтетическими данными
+    для нагрузочного тестирования.
+    """
+    help = "Создает синтетических пользователей, рецепты и связи между ними"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Число пользователей.'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Число рецептов.'
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число избранных рецептов на пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее число рецептов в корзине пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=10,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Число строк в одной пачке bulk_create.'
+        )
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Создать файлы картинок-заглушек, общие для всех рецептов.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            images=options['images'],
+            log=self.stdout.write
+        )
+        started = time.perf_counter()
+        try:
+            result = generator.generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                favorites=options['favorites'],
+                carts=options['carts'],
+                subscriptions=options['subscriptions'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'Создано за {elapsed:.1f} с: пользователей {result["users"]}, '
+            f'рецептов {result["recipes"]}, подписок '
+            f'{result["subscriptions"]}, в избранном {result["favorites"]}, '
+            f'в корзинах {result["carts"]}.\n'
+            f'Пароль пользователей: {DEFAULT_PASSWORD}\n'
+            f'Популярность и похожие рецепты считаются отдельно: '
+            f'compute_trending_scores, compute_similar_recipes.'
+        )
@@ -1,43 +1,15 @@
-import csv
+from recipe.importers import get_ingredient_importer
+from ._private import ImportCommand
 
-from django.core.management import BaseCommand
-from recipe.models import Ingredient
 
-ALREADY_LOADED_ERROR_MESSAGE = """
-Если вам нужно перезагрузить данные об ингредиентах из CSV файла,
-сначала удалите файл db.sqlite3, чтобы уничтожить базу данных.
-Затем выполните команду `python manage.py migrate`, чтобы создать
-новую пустую базу данных с таблицами.
-"""
-
-
-class Command(BaseCommand):
+class Command(ImportCommand):
     """
-    Команда для загрузки данных из файла data/ingredients.csv
-    в модель Ingredient.
+    Команда для загрузки ингредиентов из CSV или JSON файла
+    в модель Ingredient. Уже загруженные ингредиенты пропускаются,
+    поэтому команду можно запускать на рабочей базе повторно.
     """
-    help = "Загружает данные из data/ingredients.csv"
-
-    def handle(self, *args, **options):
-        """
-        Выполняет загрузку данных из CSV файла в базу данных.
-        """
-        if Ingredient.objects.exists():
-            print('Данные об ингредиентах уже загружены... выход.')
-            print(ALREADY_LOADED_ERROR_MESSAGE)
-            return
-
-        print("Загрузка данных об ингредиентах")
-
-        with open('./data/ingredients.csv', 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                name = row[0]
-                measurement_unit = row[1]
-
-                ingredient = Ingredient(
-                    name=name, measurement_unit=measurement_unit
-                )
-                ingredient.save()
+    help = "Загружает ингредиенты из data/ingredients.csv"
+    default_path = './data/ingredients.csv'
 
-        print("Данные успешно загружены.")
+    def get_importer(self, batch_size):
+        return get_ingredient_importer(batch_size)
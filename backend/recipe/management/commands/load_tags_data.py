@@ -1,41 +1,14 @@
-import csv
+from recipe.importers import get_tag_importer
+from ._private import ImportCommand
 
-from django.core.management import BaseCommand
-from recipe.models import Tag
 
-ALREADY_LOADED_ERROR_MESSAGE = """
-Если вам нужно перезагрузить данные о тегах из CSV файла,
-сначала удалите файл db.sqlite3, чтобы уничтожить базу данных.
-Затем выполните команду `python manage.py migrate`, чтобы создать
-новую пустую базу данных с таблицами.
-"""
-
-
-class Command(BaseCommand):
+class Command(ImportCommand):
     """
-    Команда для загрузки данных из файла ../data/tags.csv
-    в модель Tag.
+    Команда для загрузки тегов из CSV или JSON файла в модель Tag.
+    Теги сопоставляются по слагу, у существующих обновляется название.
     """
-    help = "Загружает данные из ./data/tags.csv"
-
-    def handle(self, *args, **options):
-        """
-        Выполняет загрузку данных из CSV файла в базу данных.
-        """
-        if Tag.objects.exists():
-            print('Данные о тегах уже загружены... выход.')
-            print(ALREADY_LOADED_ERROR_MESSAGE)
-            return
-
-        print("Загрузка данных о тегах")
-
-        with open('./data/tags.csv', 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                name = row[0]
-                slug = row[1]
-
-                tag = Tag(name=name, slug=slug)
-                tag.save()
+    help = "Загружает теги из data/tags.csv"
+    default_path = './data/tags.csv'
 
-        print("Данные успешно загружены.")
+    def get_importer(self, batch_size):
+        return get_tag_importer(batch_size)
@@ -0,0 +1,99 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipe.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета агрегированных списков покупок
+    по содержимому корзин.
+    """
+    help = "Пересчитывает или проверяет списки покупок пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сравнить сохраненные суммы с пересчитанными.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_totals(self.get_expected_totals())
+            return
+
+        with transaction.atomic():
+            self.lock_tables()
+            # На SQLite удаление сразу берет блокировку записи, поэтому
+            # суммы ниже считаются по корзинам, которые уже не изменятся
+            # до конца транзакции.
+            ShoppingListItem.objects.all().delete()
+            expected = self.get_expected_totals()
+            ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total_amount
+                    )
+                    for (user_id, ingredient_id), total_amount
+                    in expected.items()
+                ),
+                batch_size=BATCH_SIZE
+            )
+        self.stdout.write(f'Пересчитано позиций: {len(expected)}')
+
+    @staticmethod
+    def get_expected_totals():
+        return {
+            (item['user_id'], item['ingredient_id']): item['total_amount']
+            for item in ShoppingListItem.objects.expected_totals().iterator()
+        }
+
+    @staticmethod
+    def lock_tables():
+        """
+        На PostgreSQL запрещает до конца транзакции запись в корзины,
+        ингредиенты рецептов и списки покупок: иначе изменения корзин,
+        сделанные во время пересчета, затерлись бы старыми суммами.
+        Чтение таблиц не блокируется.
+        """
+        if connection.vendor != 'postgresql':
+            return
+        tables = ', '.join(
+            connection.ops.quote_name(model._meta.db_table)
+            for model in (ShoppingListItem, ShoppingCart, RecipeIngredient)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {tables} IN SHARE MODE')
+
+    def check_totals(self, expected):
+        """
+        Сообщает о расхождениях между сохраненными и пересчитанными суммами.
+        """
+        mismatches = 0
+        # Строки с нулевым количеством равносильны отсутствующим.
+        stored = ShoppingListItem.objects.filter(
+            total_amount__gt=0
+        ).values_list('user_id', 'ingredient_id', 'total_amount')
+        for user_id, ingredient_id, total_amount in stored.iterator():
+            expected_amount = expected.pop((user_id, ingredient_id), None)
+            if expected_amount != total_amount:
+                mismatches += 1
+                self.stdout.write(
+                    f'user={user_id} ingredient={ingredient_id}: '
+                    f'сохранено {total_amount}, ожидается {expected_amount}'
+                )
+        for (user_id, ingredient_id), expected_amount in expected.items():
+            mismatches += 1
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'отсутствует, ожидается {expected_amount}'
+            )
+
+        if mismatches:
+            raise CommandError(f'Найдено расхождений: {mismatches}')
+        self.stdout.write('Списки покупок согласованы.')
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipe.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'followers_count', Subscription, 'subscribed_to'),
+    (User, 'recipes_count', Recipe, 'author'),
+)
+
+
+def count_related(related_model, field):
+    """
+    Подзапрос с числом объектов related_model, ссылающихся
+    через field на текущую строку.
+    """
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+class Command(BaseCommand):
+    """
+    Команда для сверки денормализованных счетчиков рецептов
+    и пользователей с фактическим числом связанных записей.
+    """
+    help = "Пересчитывает или проверяет счетчики рецептов и пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях.'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        with transaction.atomic():
+            for model, field, related_model, related_field in COUNTERS:
+                actual = count_related(related_model, related_field)
+                drifted = model.objects.annotate(
+                    actual_count=actual
+                ).exclude(**{field: F('actual_count')})
+                count = drifted.count()
+                mismatches += count
+                if count:
+                    self.stdout.write(
+                        f'{model._meta.model_name}.{field}: '
+                        f'расхождений {count}'
+                    )
+                if count and not options['check']:
+                    model.objects.filter(
+                        pk__in=drifted.values('pk')
+                    ).update(**{field: actual})
+
+        if options['check'] and mismatches:
+            raise CommandError(f'Найдено расхождений: {mismatches}')
+        if mismatches:
+            self.stdout.write(f'Исправлено счетчиков: {mismatches}')
+        else:
+            self.stdout.write('Счетчики согласованы.')
@@ -0,0 +1,111 @@
+# Generated by Django 3.2.16 on 2026-10-17 09:12
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SQLITE_FTS_TABLE = 'recipe_recipe_fts'
+
+
+def get_postgresql_indexes():
+    return (
+        GinIndex(
+            SearchVector('name', 'text', config='russian'),
+            name='recipe_search_vector_idx'
+        ),
+        GinIndex(
+            fields=('name',),
+            opclasses=('gin_trgm_ops',),
+            name='recipe_name_trigram_idx'
+        ),
+    )
+
+
+SQLITE_FTS_TRIGGERS_SQL = (
+    f"CREATE TRIGGER {SQLITE_FTS_TABLE}_ai AFTER INSERT ON recipe_recipe "
+    f"BEGIN INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, text) "
+    f"VALUES (new.id, new.name, new.text); END",
+    f"CREATE TRIGGER {SQLITE_FTS_TABLE}_ad AFTER DELETE ON recipe_recipe "
+    f"BEGIN INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, "
+    f"name, text) VALUES ('delete', old.id, old.name, old.text); END",
+    f"CREATE TRIGGER {SQLITE_FTS_TABLE}_au AFTER UPDATE OF name, text "
+    f"ON recipe_recipe BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, text) "
+    f"VALUES (new.id, new.name, new.text); END",
+)
+
+SQLITE_FTS_DROP_TRIGGERS_SQL = (
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_au',
+)
+
+SQLITE_FTS_REBUILD_SQL = (
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"
+)
+
+SQLITE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5("
+    f"name, text, content='recipe_recipe', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 0')",
+    *SQLITE_FTS_TRIGGERS_SQL,
+    SQLITE_FTS_REBUILD_SQL,
+)
+
+SQLITE_FTS_DROP_SQL = (
+    *SQLITE_FTS_DROP_TRIGGERS_SQL,
+    f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}',
+)
+
+
+def restore_sqlite_fts_triggers(apps, schema_editor):
+    """
+    SQLite не умеет изменять столбцы, поэтому миграции, добавляющие
+    поля рецепта, пересоздают таблицу recipe_recipe, и ее триггеры
+    удаляются. Такие миграции вызывают эту функцию, чтобы вернуть
+    триггеры и перестроить индекс по текущим рецептам.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in (
+        *SQLITE_FTS_DROP_TRIGGERS_SQL,
+        *SQLITE_FTS_TRIGGERS_SQL,
+        SQLITE_FTS_REBUILD_SQL,
+    ):
+        schema_editor.execute(sql)
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Recipe = apps.get_model('recipe', 'Recipe')
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index in get_postgresql_indexes():
+            schema_editor.add_index(Recipe, index)
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Recipe = apps.get_model('recipe', 'Recipe')
+        for index in get_postgresql_indexes():
+            schema_editor.remove_index(Recipe, index)
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0003_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
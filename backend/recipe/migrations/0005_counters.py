@@ -0,0 +1,73 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:36
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+recipe_search = import_module('recipe.migrations.0004_recipe_search')
+
+
+def count_related(related_model, field):
+    return Coalesce(models.Subquery(
+        related_model.objects.filter(
+            **{field: models.OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=models.Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Favorite = apps.get_model('recipe', 'Favorite')
+    ShoppingCart = apps.get_model('recipe', 'ShoppingCart')
+    User = apps.get_model('users', 'User')
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipe.objects.update(
+        favorites_count=count_related(Favorite, 'recipe'),
+        in_carts_count=count_related(ShoppingCart, 'recipe')
+    )
+    User.objects.update(
+        followers_count=count_related(Subscription, 'subscribed_to'),
+        recipes_count=count_related(Recipe, 'author')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0004_recipe_search'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        # При откате RemoveField тоже пересоздает таблицу рецептов.
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            recipe_search.restore_sqlite_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число добавлений в корзину'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-in_carts_count', '-id'], name='recipe_in_carts_count_idx'),
+        ),
+        migrations.RunPython(
+            recipe_search.restore_sqlite_fts_triggers,
+            migrations.RunPython.noop
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
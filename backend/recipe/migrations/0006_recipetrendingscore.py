@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeTrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('score', models.FloatField(verbose_name='популярность')),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trending_score', to='recipe.recipe', verbose_name='рецепт')),
+            ],
+            options={
+                'verbose_name': 'популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipetrendingscore',
+            index=models.Index(fields=['-score', '-recipe'], name='recipe_trending_score_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:39
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+recipe_search = import_module('recipe.migrations.0004_recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_recipetrendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('score', models.FloatField(verbose_name='сходство')),
+            ],
+            options={
+                'verbose_name': 'похожий рецепт',
+                'verbose_name_plural': 'Похожие рецепты',
+            },
+        ),
+        # При откате RemoveField тоже пересоздает таблицу рецептов.
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            recipe_search.restore_sqlite_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='similar_recipes_stale',
+            field=models.BooleanField(default=True, editable=False, verbose_name='похожие рецепты требуют пересчета'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('similar_recipes_stale', True)), fields=['id'], name='recipe_similar_stale_idx'),
+        ),
+        migrations.RunPython(
+            recipe_search.restore_sqlite_fts_triggers,
+            migrations.RunPython.noop
+        ),
+        migrations.AddField(
+            model_name='recipesimilarity',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='recipe.recipe', verbose_name='рецепт'),
+        ),
+        migrations.AddField(
+            model_name='recipesimilarity',
+            name='similar_recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_for', to='recipe.recipe', verbose_name='похожий рецепт'),
+        ),
+        migrations.AddIndex(
+            model_name='recipesimilarity',
+            index=models.Index(fields=['recipe', '-score'], name='recipe_similarity_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipesimilarity',
+            constraint=models.UniqueConstraint(fields=('recipe', 'similar_recipe'), name='unique_recipe_similarity'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipesimilarity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['recipe', 'ingredient'], name='recipe_ingredient_recipe_idx'),
+        ),
+        # Индекс (tag_id, recipe_id) на автоматически созданной
+        # промежуточной таблице тегов: для нее нет модели в миграциях.
+        migrations.RunSQL(
+            'CREATE INDEX recipe_recipe_tags_tag_recipe_idx '
+            'ON recipe_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipe_recipe_tags_tag_recipe_idx'
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:43
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+recipe_search = import_module('recipe.migrations.0004_recipe_search')
+
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BACKFILL_SIZE = 50
+
+
+def fill_feeds(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    Subscription = apps.get_model('users', 'Subscription')
+    recipes = Recipe.objects.filter(
+        author__followers_count__lte=FEED_FANOUT_MAX_FOLLOWERS
+    )
+    subscriptions = Subscription.objects.filter(
+        subscribed_to__followers_count__lte=FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('user_id', 'subscribed_to_id')
+    for user_id, author_id in subscriptions.iterator():
+        FeedEntry.objects.bulk_create([
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in recipes.filter(author_id=author_id).order_by(
+                '-id'
+            ).values_list('id', flat=True)[:FEED_BACKFILL_SIZE]
+        ])
+    recipes.update(fanned_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0008_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        # При откате RemoveField тоже пересоздает таблицу рецептов.
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            recipe_search.restore_sqlite_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='разослан в ленты подписчиков'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-id'], name='recipe_not_fanned_out_idx'),
+        ),
+        migrations.RunPython(
+            recipe_search.restore_sqlite_fts_triggers,
+            migrations.RunPython.noop
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipe.recipe', verbose_name='рецепт'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (BooleanField, Case, Exists, F, OuterRef,
+                              Prefetch, Sum, Value, When)
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 
 from foodgram.constants import (INGREDIENT_MEASUREMENT_UNIT_SIZE,
@@ -8,6 +12,7 @@ from foodgram.constants import (INGREDIENT_MEASUREMENT_UNIT_SIZE,
                                 MIN_VALUE_VALIDATOR, RECIPE_NAME_SIZE,
                                 RECIPE_SHORT_CODE_SIZE, TAG_NAME_SIZE,
                                 TAG_SLUG_SIZE)
+from users.models import annotate_is_subscribed
 
 User = get_user_model()
 
@@ -78,6 +83,64 @@ class Tag(BaseModel):
         return f'{self.name} ({self.slug})'
 
 
+class RecipeQuerySet(models.QuerySet):
+    """
+    Набор запросов для рецептов.
+    """
+
+    def with_user_flags(self, user):
+        """
+        Аннотирует рецепты флагами is_favorited и is_in_shopping_cart
+        для пользователя подзапросами EXISTS.
+        """
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+        )
+
+    def with_author_subscription(self, user):
+        """
+        Аннотирует рецепты флагом is_subscribed_to_author без загрузки
+        самих авторов.
+        """
+        return annotate_is_subscribed(
+            self, user, author_field='author', name='is_subscribed_to_author'
+        )
+
+    def with_related(self, user):
+        """
+        Загружает автора (с флагом is_subscribed), теги и ингредиенты
+        фиксированным числом запросов независимо от размера выборки.
+        """
+        return self.prefetch_related(*self.related_lookups(user))
+
+    @staticmethod
+    def related_lookups(user):
+        """
+        Список предзагрузок для with_related. Используется также
+        с prefetch_related_objects для уже загруженного рецепта.
+        """
+        return (
+            Prefetch('author', queryset=annotate_is_subscribed(
+                User.objects.all(), user
+            )),
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+
 class Recipe(BaseModel):
     """
     Модель рецепта.
@@ -135,10 +198,52 @@ class Recipe(BaseModel):
         null=True,
         verbose_name='Короткий код'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число добавлений в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число добавлений в корзину'
+    )
+    similar_recipes_stale = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='похожие рецепты требуют пересчета'
+    )
+    fanned_out = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='разослан в ленты подписчиков'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=('-in_carts_count', '-id'),
+                name='recipe_in_carts_count_idx'
+            ),
+            models.Index(
+                fields=('id',),
+                condition=models.Q(similar_recipes_stale=True),
+                name='recipe_similar_stale_idx'
+            ),
+            models.Index(
+                fields=('author', '-id'),
+                condition=models.Q(fanned_out=False),
+                name='recipe_not_fanned_out_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} by {self.author}'
@@ -199,6 +304,12 @@ class RecipeIngredient(BaseModel):
                 name='unique_ingredient_in_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'ingredient'),
+                name='recipe_ingredient_recipe_idx'
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -273,3 +384,248 @@ class ShoppingCart(UserRecipeBase):
 
     def __str__(self):
         return f'{self.user} добавил в корзину {self.recipe.name}'
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+    """
+    Набор запросов для агрегированного списка покупок.
+    """
+
+    def apply_deltas(self, user_ids, deltas):
+        """
+        Изменяет суммарное количество ингредиентов в списках покупок
+        пользователей. deltas — словарь {id ингредиента: изменение}.
+
+        Недостающие строки создаются с нулевым количеством
+        (ignore_conflicts), затем все изменения применяются одним UPDATE
+        с F('total_amount'), поэтому одновременные запросы не теряют
+        изменения друг друга. Строки с нулевым количеством не удаляются
+        (иначе удаление могло бы потерять параллельное добавление)
+        и не попадают в список покупок.
+        """
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        user_ids = list(user_ids)
+        if not deltas or not user_ids:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=0
+                    )
+                    for user_id in user_ids
+                    for ingredient_id, delta in deltas.items() if delta > 0
+                ],
+                ignore_conflicts=True
+            )
+            self.filter(
+                user_id__in=user_ids, ingredient_id__in=deltas
+            ).update(
+                total_amount=Greatest(
+                    F('total_amount') + Case(
+                        *(
+                            When(ingredient_id=ingredient_id, then=delta)
+                            for ingredient_id, delta in deltas.items()
+                        ),
+                        output_field=models.IntegerField()
+                    ),
+                    0
+                ),
+                updated_at=timezone.now()
+            )
+
+    def add_recipe(self, user_id, recipe_id, sign=1):
+        """
+        Добавляет ингредиенты рецепта в список покупок пользователя
+        (или вычитает их при sign=-1).
+        """
+        deltas = {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in self.recipe_amounts(
+                recipe_id
+            ).items()
+        }
+        self.apply_deltas([user_id], deltas)
+
+    def remove_recipe(self, user_id, recipe_id):
+        """
+        Вычитает ингредиенты рецепта из списка покупок пользователя.
+        """
+        self.add_recipe(user_id, recipe_id, sign=-1)
+
+    def apply_recipe_changes(self, recipe_id, deltas):
+        """
+        Применяет изменение ингредиентов рецепта к спискам покупок
+        всех пользователей, у которых рецепт в корзине.
+        """
+        user_ids = ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+        self.apply_deltas(user_ids, deltas)
+
+    @staticmethod
+    def recipe_amounts(recipe_id):
+        """
+        Возвращает количество ингредиентов рецепта:
+        {id ингредиента: количество}.
+        """
+        return dict(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'))
+
+    @staticmethod
+    def expected_totals():
+        """
+        Возвращает суммы ингредиентов, посчитанные заново по корзинам.
+        """
+        return RecipeIngredient.objects.filter(
+            recipe__shopping_carts__isnull=False
+        ).values(
+            'ingredient_id', user_id=models.F('recipe__shopping_carts__user')
+        ).annotate(total_amount=Sum('amount')).order_by()
+
+
+class ShoppingListItem(BaseModel):
+    """
+    Модель агрегированного списка покупок: суммарное количество
+    ингредиента по всем рецептам в корзине пользователя.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='суммарное количество'
+    )
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} {self.total_amount}'
+
+
+class RecipeTrendingScore(BaseModel):
+    """
+    Модель рассчитанной популярности рецепта с затуханием по времени.
+    Заполняется командой compute_trending_scores.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='trending_score',
+        verbose_name='рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='популярность'
+    )
+
+    class Meta:
+        verbose_name = 'популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(
+                fields=('-score', '-recipe'),
+                name='recipe_trending_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.score:.3f}'
+
+
+class RecipeSimilarity(BaseModel):
+    """
+    Модель похожего рецепта: ближайшие по составу ингредиентов рецепты
+    с коэффициентом Жаккара. Заполняется командой compute_similar_recipes.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        verbose_name='рецепт'
+    )
+    similar_recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_for',
+        verbose_name='похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='сходство'
+    )
+
+    class Meta:
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar_recipe'),
+                name='unique_recipe_similarity'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'),
+                name='recipe_similarity_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar_recipe}: {self.score:.3f}'
+
+
+class FeedEntry(BaseModel):
+    """
+    Модель записи ленты: рецепт автора, на которого подписан
+    пользователь. Заполняется при создании рецепта (см. recipe/feed.py).
+    Лента читается по индексу уникальности (user, recipe) в обратном
+    порядке, отдельный индекс не нужен.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
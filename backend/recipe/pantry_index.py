@@ -0,0 +1,217 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import RecipeIngredient
+from .versions import PANTRY_VERSION, bump_version, get_version
+
+CHANGES_SEQUENCE_KEY = 'pantry:sequence'
+CHANGE_KEY = 'pantry:change:{number}'
+CHANGE_TIMEOUT = 24 * 60 * 60
+# При большем числе накопившихся изменений индекс проще построить заново.
+MAX_PENDING_CHANGES = 500
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def publish_recipe_change(recipe_id):
+    """
+    Записывает в журнал изменений в кэше, что состав рецепта изменился.
+    Процессы применят изменение к своим индексам при следующем запросе.
+    """
+    def publish():
+        if cache.add(CHANGES_SEQUENCE_KEY, 0, None):
+            # Журнал начат заново (ключ вытеснен из кэша): индексы,
+            # построенные по старому журналу, нужно перестроить.
+            bump_version(PANTRY_VERSION)
+        number = cache.incr(CHANGES_SEQUENCE_KEY)
+        cache.set(CHANGE_KEY.format(number=number), recipe_id, CHANGE_TIMEOUT)
+
+    transaction.on_commit(publish)
+
+
+def get_change_number():
+    return cache.get(CHANGES_SEQUENCE_KEY, 0)
+
+
+class RankedRecipes:
+    """
+    Рецепты, упорядоченные по числу недостающих ингредиентов,
+    при равенстве сначала новые. Последовательность ленивая: срез
+    выбирает только нужное число лучших рецептов через heapq, поэтому
+    ее можно передавать пагинатору без сортировки всех кандидатов.
+    Элементы — пары (число недостающих ингредиентов, id рецепта).
+    """
+
+    def __init__(self, matches, sizes):
+        self.matches = matches
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(len(self))
+        ranked = heapq.nsmallest(stop, (
+            (self.sizes[recipe_id] - matched, -recipe_id)
+            for recipe_id, matched in self.matches.items()
+        ))
+        return [
+            (missing, -recipe_id) for missing, recipe_id in ranked[start:]
+        ]
+
+
+class PantryIndex:
+    """
+    Обратный индекс ингредиент → отсортированный массив id рецептов
+    в памяти процесса для поиска рецептов по имеющимся продуктам.
+
+    Поиск читает индекс и размеры рецептов через один атрибут snapshot.
+    update_recipes собирает новые словари и подменяет снимок одним
+    присваиванием, поэтому поиск в других потоках (и ленивый
+    RankedRecipes) всегда видит согласованную пару словарей.
+    Составы рецептов ingredients нужны только update_recipes, который
+    вызывается под _index_lock.
+    """
+
+    def __init__(self, rows, version=None, change_number=0):
+        self.version = version
+        self.change_number = change_number
+        ingredients = defaultdict(list)
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            ingredients[recipe_id].append(ingredient_id)
+            recipes[ingredient_id].append(recipe_id)
+        # Составы хранятся кортежами: они заметно компактнее множеств.
+        self.ingredients = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in ingredients.items()
+        }
+        self.snapshot = (
+            {
+                ingredient_id: array('q', sorted(recipe_ids))
+                for ingredient_id, recipe_ids in recipes.items()
+            },
+            {
+                recipe_id: len(ingredients)
+                for recipe_id, ingredients in self.ingredients.items()
+            },
+        )
+
+    @classmethod
+    def build(cls, version=None, change_number=0):
+        """Строит индекс по всем ингредиентам рецептов из БД."""
+        rows = RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by()
+        return cls(
+            rows.iterator(chunk_size=2000),
+            version=version,
+            change_number=change_number
+        )
+
+    def search(self, ingredient_ids):
+        """
+        Возвращает рецепты, в которых есть хотя бы один из ингредиентов,
+        по возрастанию числа недостающих: сначала те, что можно
+        приготовить полностью.
+        """
+        recipes, sizes = self.snapshot
+        matches = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matches.update(recipes.get(ingredient_id, ()))
+        return RankedRecipes(matches, sizes)
+
+    def update_recipes(self, recipe_ids):
+        """
+        Перечитывает состав рецептов recipe_ids из БД и обновляет индекс.
+        Изменения вносятся в копии словарей и массивов, которые затем
+        подменяют снимок целиком.
+        """
+        current = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            current[recipe_id].add(ingredient_id)
+
+        recipes, sizes = self.snapshot
+        recipes, sizes = dict(recipes), dict(sizes)
+        changed = {}
+        for recipe_id in set(recipe_ids):
+            old = set(self.ingredients.get(recipe_id, ()))
+            new = current.get(recipe_id, set())
+            for ingredient_id in old - new:
+                changed.setdefault(ingredient_id, []).append(
+                    (recipe_id, False)
+                )
+            for ingredient_id in new - old:
+                changed.setdefault(ingredient_id, []).append(
+                    (recipe_id, True)
+                )
+            if new:
+                self.ingredients[recipe_id] = tuple(new)
+                sizes[recipe_id] = len(new)
+            else:
+                self.ingredients.pop(recipe_id, None)
+                sizes.pop(recipe_id, None)
+
+        for ingredient_id, changes in changed.items():
+            postings = array('q', recipes.get(ingredient_id, ()))
+            for recipe_id, added in changes:
+                position = bisect_left(postings, recipe_id)
+                present = (
+                    position < len(postings)
+                    and postings[position] == recipe_id
+                )
+                if added and not present:
+                    insort(postings, recipe_id)
+                elif not added and present:
+                    del postings[position]
+            recipes[ingredient_id] = postings
+        self.snapshot = (recipes, sizes)
+
+
+def get_pantry_index():
+    """
+    Возвращает индекс текущего процесса, применяя к нему изменения
+    из журнала. Если журнал неполон (кэш очищен или изменений слишком
+    много), индекс строится заново.
+    """
+    global _index
+    version = get_version(PANTRY_VERSION)
+    change_number = get_change_number()
+    index = _index
+    if (
+        index is not None
+        and index.version == version
+        and index.change_number == change_number
+    ):
+        return index
+    with _index_lock:
+        index = _index
+        if index is None or index.version != version:
+            _index = PantryIndex.build(version, change_number)
+            return _index
+        if index.change_number == change_number:
+            return index
+        pending = change_number - index.change_number
+        if 0 < pending <= MAX_PENDING_CHANGES:
+            keys = [
+                CHANGE_KEY.format(number=number)
+                for number in range(index.change_number + 1, change_number + 1)
+            ]
+            changes = cache.get_many(keys)
+            if len(changes) == len(keys):
+                index.update_recipes(changes.values())
+                index.change_number = change_number
+                return index
+        _index = PantryIndex.build(version, change_number)
+        return _index
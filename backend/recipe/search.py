@@ -0,0 +1,75 @@
+import re
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection
+from django.db.models import F, Q
+
+SEARCH_CONFIG = 'russian'
+SQLITE_FTS_TABLE = 'recipe_recipe_fts'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def get_search_vector():
+    """
+    Выражение поискового вектора по названию и тексту рецепта.
+    Совпадает с выражением GIN-индекса recipe_search_vector_idx
+    (миграция 0004), поэтому индекс используется при фильтрации.
+    """
+    return SearchVector('name', 'text', config=SEARCH_CONFIG)
+
+
+def search_recipes(queryset, value):
+    """
+    Фильтрует рецепты по поисковой строке и упорядочивает
+    по релевантности. Для PostgreSQL используется полнотекстовый
+    поиск и триграммы по названию, для SQLite — таблица FTS5.
+    """
+    value = value.strip()
+    if not value:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return search_postgresql(queryset, value)
+    if connection.vendor == 'sqlite':
+        return search_sqlite(queryset, value)
+    return queryset.filter(
+        Q(name__icontains=value) | Q(text__icontains=value)
+    )
+
+
+def search_postgresql(queryset, value):
+    """
+    Полнотекстовый поиск (websearch-синтаксис) с допуском опечаток
+    в названии через pg_trgm.
+    """
+    query = SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        search=get_search_vector(),
+        rank=SearchRank(F('search'), query),
+        similarity=TrigramSimilarity('name', value),
+    ).filter(
+        Q(search=query) | Q(name__trigram_similar=value)
+    ).order_by('-rank', '-similarity', '-id')
+
+
+def search_sqlite(queryset, value):
+    """
+    Поиск по таблице FTS5: каждое слово запроса ищется по префиксу,
+    результаты упорядочиваются по bm25. Таблица FTS5 присоединяется
+    к рецептам один раз, и MATCH выполняется один раз на запрос:
+    столбец rank таблицы — это bm25 найденной строки.
+    """
+    words = WORD_RE.findall(value)
+    if not words:
+        return queryset.none()
+    match = ' '.join(f'"{word}"*' for word in words)
+    return queryset.extra(
+        select={'rank': f'{SQLITE_FTS_TABLE}.rank'},
+        tables=[SQLITE_FTS_TABLE],
+        where=[
+            f'{SQLITE_FTS_TABLE}.rowid = recipe_recipe.id',
+            f'{SQLITE_FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+    ).order_by('rank', '-id')
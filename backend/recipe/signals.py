@@ -0,0 +1,168 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users.models import Subscription, update_counter
+from .feed import add_author_to_feed, remove_author_from_feed
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListItem, Tag)
+from .pantry_index import publish_recipe_change
+from .versions import (INGREDIENTS_VERSION, PANTRY_VERSION, RECIPES_VERSION,
+                       TAGS_VERSION, bump_version)
+
+User = get_user_model()
+
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    """
+    Добавляет ингредиенты рецепта в список покупок пользователя.
+    """
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из списка покупок пользователя.
+    Вызывается до удаления, пока ингредиенты рецепта еще существуют.
+    """
+    ShoppingListItem.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик избранного или корзин рецепта.
+    """
+    if created:
+        update_counter(Recipe, instance.recipe_id, COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик избранного или корзин рецепта.
+    """
+    update_counter(Recipe, instance.recipe_id, COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик рецептов автора.
+    """
+    if created:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик рецептов автора.
+    """
+    update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """
+    Меняет версию ингредиентов, чтобы процессы перестроили индекс,
+    и версию рецептов, в выдаче которых есть названия ингредиентов.
+    """
+    bump_version(INGREDIENTS_VERSION)
+    bump_version(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Subscription)
+def add_subscription_to_feed(sender, instance, created, **kwargs):
+    """
+    Добавляет последние рецепты автора в ленту нового подписчика.
+    """
+    if created:
+        add_author_to_feed(instance.user_id, instance.subscribed_to_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_subscription_from_feed(sender, instance, **kwargs):
+    """
+    Убирает рецепты автора из ленты отписавшегося пользователя.
+    """
+    remove_author_from_feed(instance.user_id, instance.subscribed_to_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def update_pantry_index(sender, instance, **kwargs):
+    """
+    Сообщает индексам поиска по продуктам об изменении рецепта.
+    Ингредиенты рецепта сохраняются в той же транзакции, поэтому
+    к моменту публикации изменения они уже записаны.
+    """
+    publish_recipe_change(instance.pk)
+
+
+@receiver(post_delete, sender=Ingredient)
+def invalidate_pantry_index(sender, **kwargs):
+    """
+    Удаление ингредиента каскадно меняет составы рецептов без сигналов,
+    поэтому индекс поиска по продуктам перестраивается целиком.
+    """
+    bump_version(PANTRY_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """
+    Меняет версию тегов, от которой зависит ETag списка тегов.
+    """
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_recipes(sender, **kwargs):
+    """
+    Меняет версию рецептов, сбрасывая закэшированные списки.
+    Избранное и корзины меняют счетчики, по которым сортируются
+    списки (ordering=-favorites_count).
+    Удаление ингредиентов рецепта всегда сопровождается сохранением
+    или удалением самого рецепта либо ингредиента, поэтому post_delete
+    для RecipeIngredient не нужен и не отключает быстрое удаление.
+    """
+    bump_version(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_recipes_on_user_change(sender, update_fields=None, **kwargs):
+    """
+    Меняет версию рецептов при изменении автора.
+    Обновление только last_login при входе не учитывается.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_version(RECIPES_VERSION)
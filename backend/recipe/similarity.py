@@ -0,0 +1,187 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Min
+
+from foodgram.constants import (SIMILAR_MAX_INGREDIENT_RECIPES,
+                                SIMILAR_RECIPES_LIMIT)
+from .models import Recipe, RecipeIngredient, RecipeSimilarity
+
+CHUNK_SIZE = 500
+# Рецептов в одной порции расчета: вместе с кандидатами (не больше
+# SIMILAR_MAX_INGREDIENT_RECIPES на каждый редкий ингредиент) определяет
+# объем данных в памяти.
+RECIPES_CHUNK_SIZE = 100
+
+
+def chunked(items, size=CHUNK_SIZE):
+    """Разбивает список на части не длиннее size."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class IngredientMatrix:
+    """
+    Разреженная матрица рецепт × ингредиент, которая читается из БД
+    порциями рецептов. Кандидаты в похожие ищутся по обратному индексу
+    ингредиент → рецепты только для редких ингредиентов: ингредиенты,
+    которые есть больше чем в SIMILAR_MAX_INGREDIENT_RECIPES рецептах
+    (соль, вода), почти не говорят о сходстве, а их списки рецептов
+    самые длинные. Коэффициент Жаккара с найденными кандидатами
+    считается по всем ингредиентам.
+    """
+
+    def __init__(self):
+        self.frequent = set(
+            RecipeIngredient.objects.values('ingredient').annotate(
+                recipes_count=Count('pk')
+            ).filter(
+                recipes_count__gt=SIMILAR_MAX_INGREDIENT_RECIPES
+            ).order_by().values_list('ingredient', flat=True)
+        )
+
+    @staticmethod
+    def load(field, values):
+        """Строки (рецепт, ингредиент), у которых field входит в values."""
+        for ids in chunked(values):
+            yield from RecipeIngredient.objects.filter(**{
+                f'{field}__in': ids
+            }).values_list('recipe_id', 'ingredient_id').order_by()
+
+    def similarities(self, recipe_ids):
+        """
+        Возвращает для каждого рецепта порции recipe_ids коэффициенты
+        Жаккара с рецептами, у которых есть общий редкий ингредиент.
+        """
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in self.load('recipe_id', recipe_ids):
+            ingredients[recipe_id].add(ingredient_id)
+        rare = {
+            ingredient_id for recipe_ingredients in ingredients.values()
+            for ingredient_id in recipe_ingredients - self.frequent
+        }
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in self.load('ingredient_id', rare):
+            recipes[ingredient_id].append(recipe_id)
+
+        candidates = {}
+        for recipe_id, recipe_ingredients in ingredients.items():
+            found = set()
+            for ingredient_id in recipe_ingredients - self.frequent:
+                found.update(recipes[ingredient_id])
+            found.discard(recipe_id)
+            candidates[recipe_id] = found
+        others = set().union(*candidates.values()) - ingredients.keys()
+        for recipe_id, ingredient_id in self.load('recipe_id', others):
+            ingredients[recipe_id].add(ingredient_id)
+
+        result = {recipe_id: {} for recipe_id in recipe_ids}
+        for recipe_id, found in candidates.items():
+            recipe_ingredients = ingredients[recipe_id]
+            for other_id in found:
+                other_ingredients = ingredients[other_id]
+                common = len(recipe_ingredients & other_ingredients)
+                result[recipe_id][other_id] = common / (
+                    len(recipe_ingredients) + len(other_ingredients) - common
+                )
+        return result
+
+    def nearest(self, recipe_ids, limit=SIMILAR_RECIPES_LIMIT):
+        """
+        Возвращает для каждого рецепта порции recipe_ids limit самых
+        похожих рецептов в виде (score, id).
+        """
+        return {
+            recipe_id: heapq.nlargest(limit, (
+                (score, other_id) for other_id, score in scores.items()
+            ))
+            for recipe_id, scores in self.similarities(recipe_ids).items()
+        }
+
+
+def find_affected_recipes(matrix, stale_ids):
+    """
+    Определяет рецепты, чьи списки похожих могут измениться после
+    изменения состава рецептов stale_ids: сами эти рецепты, рецепты,
+    у которых они уже в списке, и рецепты, в список которых они
+    теперь попадают по сходству.
+    """
+    affected = set(stale_ids)
+    for ids in chunked(stale_ids):
+        affected.update(RecipeSimilarity.objects.filter(
+            similar_recipe__in=ids
+        ).values_list('recipe_id', flat=True))
+
+    candidates = {}
+    for ids in chunked(stale_ids, RECIPES_CHUNK_SIZE):
+        for scores in matrix.similarities(ids).values():
+            for other_id, score in scores.items():
+                if other_id not in affected:
+                    candidates[other_id] = max(
+                        score, candidates.get(other_id, 0)
+                    )
+
+    for ids in chunked(candidates):
+        thresholds = {
+            item['recipe']: item
+            for item in RecipeSimilarity.objects.filter(
+                recipe__in=ids
+            ).values('recipe').annotate(
+                min_score=Min('score'), count=Count('pk')
+            ).order_by()
+        }
+        for recipe_id in ids:
+            threshold = thresholds.get(recipe_id)
+            if (
+                threshold is None
+                or threshold['count'] < SIMILAR_RECIPES_LIMIT
+                # При равенстве побеждает рецепт с большим id (nearest
+                # сравнивает пары (score, id)), поэтому список тоже
+                # пересчитывается.
+                or candidates[recipe_id] >= threshold['min_score']
+            ):
+                affected.add(recipe_id)
+    return affected
+
+
+def compute_similar_recipes(full=False):
+    """
+    Пересчитывает таблицу похожих рецептов. По умолчанию обрабатываются
+    только рецепты, помеченные как измененные, и рецепты, на списки
+    которых они влияют. Рецепты обрабатываются порциями
+    по RECIPES_CHUNK_SIZE: списки похожих порции заменяются в одной
+    транзакции, поэтому во время пересчета, в том числе полного,
+    /similar/ отдает старые списки, а не пустые.
+    Возвращает число пересчитанных рецептов.
+    """
+    stale = Recipe.objects.all() if full else Recipe.objects.filter(
+        similar_recipes_stale=True
+    )
+    stale_ids = list(stale.values_list('pk', flat=True))
+    if not stale_ids:
+        return 0
+    # Флаг снимается до чтения ингредиентов: изменения, сделанные
+    # во время расчета, снова пометят рецепт для следующего запуска.
+    for ids in chunked(stale_ids):
+        Recipe.objects.filter(pk__in=ids).update(similar_recipes_stale=False)
+
+    matrix = IngredientMatrix()
+    affected = stale_ids if full else find_affected_recipes(
+        matrix, stale_ids
+    )
+    for ids in chunked(sorted(affected), RECIPES_CHUNK_SIZE):
+        nearest = matrix.nearest(ids)
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe__in=ids).delete()
+            RecipeSimilarity.objects.bulk_create(
+                RecipeSimilarity(
+                    recipe_id=recipe_id,
+                    similar_recipe_id=other_id,
+                    score=score
+                )
+                for recipe_id in ids
+                for score, other_id in nearest[recipe_id]
+            )
+    return len(affected)
@@ -0,0 +1,39 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from foodgram.constants import TRENDING_HALF_LIFE_HOURS, TRENDING_WINDOW_DAYS
+from .models import Favorite, ShoppingCart
+
+CHUNK_SIZE = 2000
+
+# Вес события для каждой модели: добавление в корзину означает,
+# что рецепт собираются готовить, поэтому ценится выше.
+EVENT_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingCart, 1.5),
+)
+
+
+def compute_trending_scores(now=None):
+    """
+    Считает популярность рецептов по добавлениям в избранное и корзину.
+    Вклад события затухает экспоненциально с периодом полураспада
+    TRENDING_HALF_LIFE_HOURS, события старше TRENDING_WINDOW_DAYS
+    не учитываются. События читаются из БД порциями, в памяти хранится
+    только сумма по каждому рецепту.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=TRENDING_WINDOW_DAYS)
+    decay = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+    scores = defaultdict(float)
+    for model, weight in EVENT_WEIGHTS:
+        events = model.objects.filter(created_at__gte=since).values_list(
+            'recipe_id', 'created_at'
+        ).order_by()
+        for recipe_id, created_at in events.iterator(chunk_size=CHUNK_SIZE):
+            age = max((now - created_at).total_seconds(), 0)
+            scores[recipe_id] += weight * math.exp(-decay * age)
+    return scores
@@ -0,0 +1,32 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY_PREFIX = 'version'
+INGREDIENTS_VERSION = 'ingredients'
+PANTRY_VERSION = 'pantry'
+RECIPES_VERSION = 'recipes'
+TAGS_VERSION = 'tags'
+
+
+def get_version(name):
+    """
+    Возвращает текущую версию набора данных из кэша.
+    Если версии нет (кэш очищен), создается новая, поэтому
+    старые производные данные не будут приняты за актуальные.
+    """
+    key = f'{VERSION_KEY_PREFIX}:{name}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """
+    Меняет версию набора данных после фиксации текущей транзакции.
+    """
+    key = f'{VERSION_KEY_PREFIX}:{name}'
+    transaction.on_commit(lambda: cache.set(key, uuid4().hex, None))
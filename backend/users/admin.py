@@ -8,8 +8,10 @@ class CustomUserAdmin(UserAdmin):
     model = User
     list_display = (
         'email', 'username', 'first_name',
-        'last_name', 'is_staff', 'is_active'
+        'last_name', 'is_staff', 'is_active',
+        'followers_count', 'recipes_count'
     )
+    readonly_fields = ('followers_count', 'recipes_count')
     list_filter = (
         'email', 'username', 'is_staff', 'is_active'
     )
@@ -18,6 +20,7 @@ class CustomUserAdmin(UserAdmin):
         ('Personal info', {'fields': ('first_name', 'last_name')}),
         ('Permissions', {'fields': ('is_staff', 'is_active')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
+        ('Statistics', {'fields': ('followers_count', 'recipes_count')}),
     )
     add_fieldsets = (
         (None, {
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
-from django.db.models import CheckConstraint, F, Q
+from django.db.models import (BooleanField, CheckConstraint, Exists, F,
+                              OuterRef, Q, Value)
 
 from foodgram.constants import USER_USERNAME_SIZE, USER_NAME_SIZE
 
@@ -49,6 +50,16 @@ class User(AbstractUser, BaseModel):
         blank=True,
         null=True
     )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число подписчиков'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число рецептов'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
@@ -94,3 +105,35 @@ class Subscription(BaseModel):
 
     def __str__(self):
         return f'{self.user} подписан на {self.subscribed_to}'
+
+
+def annotate_is_subscribed(queryset, user, author_field='pk',
+                           name='is_subscribed'):
+    """
+    Аннотирует пользователей флагом is_subscribed для текущего пользователя.
+    Через author_field и name так же аннотируется любая модель
+    со ссылкой на автора.
+    """
+    if user.is_anonymous:
+        return queryset.annotate(
+            **{name: Value(False, output_field=BooleanField())}
+        )
+    return queryset.annotate(**{
+        name: Exists(
+            Subscription.objects.filter(
+                user=user, subscribed_to=OuterRef(author_field)
+            )
+        )
+    })
+
+
+def update_counter(model, pk, field, delta):
+    """
+    Атомарно изменяет счетчик field объекта pk на delta выражением F().
+    Счетчик не уходит в минус: расхождения исправляет
+    команда reconcile_counters.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subscription, User, update_counter
+
+
+@receiver(post_save, sender=Subscription)
+def increment_followers_count(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик подписчиков автора.
+    """
+    if created:
+        update_counter(User, instance.subscribed_to_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_followers_count(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик подписчиков автора.
+    """
+    update_counter(User, instance.subscribed_to_id, 'followers_count', -1)